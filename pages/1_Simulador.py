@@ -13,18 +13,24 @@ from src.models import (
     ParametrosSimulacao,
 )
 from src.dados_tarifarios import (
-    carregar_csv_aneel,
+    carregar_indice_tarifas,
     listar_distribuidoras,
     listar_subgrupos,
     listar_modalidades,
     obter_tarifas_vigentes,
+    obter_historico_tarifas,
 )
 from src.logica_calculadora import LogicaCalculadora
+from src.cache_simulacao import calcular_simulacao, chave_simulacao
+from src.analise_oferta import varrer_oferta, resolver_desconto_minimo, resolver_preco_maximo
+from src.risco_reajuste import simular_reajustes
 from src.grafico import (
     criar_grafico_economia,
     criar_grafico_desconto_mensal,
     criar_grafico_composicao,
+    criar_grafico_sensibilidade,
 )
+from src.exportar_grafico import exportar_png
 from src.relatorio_pdf import gerar_relatorio
 from src.formatacao import formatar_moeda, formatar_percentual
 
@@ -34,8 +40,8 @@ st.title("⚡ Simulador de Economia")
 # ---------------------------------------------------------------------------
 # Load tariff data (cached)
 # ---------------------------------------------------------------------------
-df_tarifas = carregar_csv_aneel()
-distribuidoras = listar_distribuidoras(df_tarifas)
+indice_tarifas = carregar_indice_tarifas()
+distribuidoras = listar_distribuidoras(indice_tarifas)
 
 # ---------------------------------------------------------------------------
 # Helper: translate Pydantic validation errors to Portuguese
@@ -76,6 +82,37 @@ def _traduzir_erro_validacao(e: ValidationError) -> str:
     return "  \n".join(mensagens)
 
 
+# ---------------------------------------------------------------------------
+# Sensitivity / risk analyses, memoized per simulation: every widget change
+# reruns the page, so they are keyed on chave_simulacao (params + tariff
+# version) and the params themselves are left out of the hash (_params)
+# ---------------------------------------------------------------------------
+@st.cache_data(max_entries=64, show_spinner=False)
+def _varredura_oferta(chave: str, _params: ParametrosSimulacao):
+    taxas = sorted({*range(0, 21, 2), _params.contrato.taxa_vpl})
+    if _params.oferta.tipo_oferta == "Desconto Garantido":
+        return varrer_oferta(_params, descontos=range(0, 51, 5), taxas_vpl=taxas)
+    # Current price ladder scaled from -20% to +20%
+    escalas = [0.8, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.2]
+    escadas = [[p * f for p in _params.oferta.precos_por_ano or []] for f in escalas]
+    return varrer_oferta(_params, escadas_precos=escadas, taxas_vpl=taxas)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _oferta_para_alvo(chave: str, _params: ParametrosSimulacao, alvo: float):
+    if _params.oferta.tipo_oferta == "Desconto Garantido":
+        return resolver_desconto_minimo(_params, alvo)
+    return resolver_preco_maximo(_params, alvo, forma=_params.oferta.precos_por_ano)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _risco_reajuste(chave: str, _params: ParametrosSimulacao) -> dict:
+    historico = obter_historico_tarifas(
+        indice_tarifas, _params.distribuidora, _params.subgrupo, _params.modalidade
+    )
+    return simular_reajustes(_params, historico=historico, semente=0)
+
+
 # ---------------------------------------------------------------------------
 # Layout: Form (left) | Results (right)
 # ---------------------------------------------------------------------------
@@ -88,14 +125,14 @@ with col_form:
         # --- Distributor / Subgroup / Modality (cascading) ---
         distribuidora = st.selectbox("Distribuidora", distribuidoras)
 
-        subgrupos = listar_subgrupos(df_tarifas, distribuidora)
+        subgrupos = listar_subgrupos(indice_tarifas, distribuidora)
         subgrupo = st.selectbox("SubGrupo", subgrupos)
 
-        modalidades = listar_modalidades(df_tarifas, distribuidora, subgrupo)
+        modalidades = listar_modalidades(indice_tarifas, distribuidora, subgrupo)
         modalidade = st.selectbox("Modalidade", modalidades)
 
         # --- Auto-loaded tariffs (read-only info) ---
-        tarifas = obter_tarifas_vigentes(df_tarifas, distribuidora, subgrupo, modalidade)
+        tarifas = obter_tarifas_vigentes(indice_tarifas, distribuidora, subgrupo, modalidade)
 
         if tarifas.tusd_kw_fp == 0.0 and tarifas.te_fp == 0.0:
             st.warning(
@@ -207,8 +244,8 @@ def _exibir_resultados(resultado, params, nome_cliente):
     st.plotly_chart(fig_economia, use_container_width=True)
 
     # --- Tabs ---
-    tab_anual, tab_mensal, tab_composicao = st.tabs(
-        ["Resultados Anuais", "Evolução Mensal", "Composição Custo"]
+    tab_anual, tab_mensal, tab_composicao, tab_sensibilidade = st.tabs(
+        ["Resultados Anuais", "Evolução Mensal", "Composição Custo", "Sensibilidade"]
     )
 
     with tab_anual:
@@ -241,15 +278,52 @@ def _exibir_resultados(resultado, params, nome_cliente):
             fig_comp = criar_grafico_composicao(acr_comp)
             st.plotly_chart(fig_comp, use_container_width=True)
 
+    with tab_sensibilidade:
+        chave = chave_simulacao(params, indice_tarifas.versao)
+        st.plotly_chart(criar_grafico_sensibilidade(_varredura_oferta(chave, params)), use_container_width=True)
+
+        alvo_pct = st.number_input(
+            "Desconto geral alvo (%)", min_value=0.0, max_value=100.0, value=20.0, step=1.0,
+        )
+        if params.oferta.tipo_oferta == "Desconto Garantido":
+            desconto_min = _oferta_para_alvo(chave, params, alvo_pct / 100)
+            if desconto_min is None:
+                st.warning("Nenhum desconto garantido atinge o alvo.")
+            else:
+                st.metric("Desconto garantido mínimo", formatar_percentual(desconto_min / 100))
+        else:
+            escada = _oferta_para_alvo(chave, params, alvo_pct / 100)
+            if escada is None:
+                st.warning("Nenhum preço atinge o alvo.")
+            else:
+                st.caption("Preços máximos por ano (R$/MWh) que atingem o alvo")
+                st.dataframe(
+                    pd.DataFrame({"Ano": range(1, len(escada) + 1), "Preço": [formatar_moeda(p) for p in escada]}),
+                    hide_index=True,
+                )
+
+        # --- Readjustment risk (Monte Carlo fitted from the tariff history) ---
+        risco = _risco_reajuste(chave, params)
+        st.subheader("Risco de Reajuste Tarifário")
+        st.caption(
+            f"{risco['n_caminhos']} cenários · reajuste médio "
+            f"{formatar_percentual(risco['reajuste_medio'])} ± {formatar_percentual(risco['desvio'])} a.a."
+        )
+        st.dataframe(
+            pd.DataFrame({
+                "Percentil": list(risco["economia_total"].keys()),
+                "Economia Total": [formatar_moeda(v) for v in risco["economia_total"].values()],
+                "Economia VPL": [formatar_moeda(v) for v in risco["economia_vpl"].values()],
+            }),
+            hide_index=True,
+        )
+
     # --- Downloads ---
     st.divider()
     dl1, dl2 = st.columns(2)
 
     with dl1:
-        try:
-            fig_png = fig_economia.to_image(format="png", width=800, height=400)
-        except Exception:
-            fig_png = b""
+        fig_png = exportar_png(fig_economia)
 
         try:
             pdf_bytes = gerar_relatorio(
@@ -259,6 +333,7 @@ def _exibir_resultados(resultado, params, nome_cliente):
                 periodo=resultado["periodo"],
                 grafico_png=fig_png,
                 resultados_anuais=resultado["resultados_anuais"],
+                grafico_series=(resultado["gastos_acl_anual"], resultado["economias_anual"], resultado["anos"]),
             )
             st.download_button(
                 "📄 Baixar Relatório PDF",
@@ -271,7 +346,7 @@ def _exibir_resultados(resultado, params, nome_cliente):
             st.error("Erro ao gerar o relatório PDF. Tente novamente.")
 
     with dl2:
-        df_csv = pd.DataFrame(resultado["resultados_mensais"])
+        df_csv = resultado.to_dataframe()
         csv_cols = ["periodo", "custo_acr_mwh", "custo_acl_mwh", "desconto", "economia", "gasto_acr", "gasto_acl"]
         csv_bytes = df_csv[csv_cols].to_csv(index=False, sep=";", decimal=",").encode("utf-8-sig")
         st.download_button(
@@ -327,7 +402,13 @@ with col_result:
                     tarifas=tarifas,
                 )
 
-                resultado = LogicaCalculadora(params).calcular()
+                # One calculator per session: what-if changes rerun only the
+                # stages they affect (e.g. a new discount skips the ACR series)
+                if "calculadora" not in st.session_state:
+                    st.session_state["calculadora"] = LogicaCalculadora(params)
+                resultado = calcular_simulacao(
+                    params, indice_tarifas.versao, st.session_state["calculadora"]
+                )
 
                 # Store in session state for persistence across reruns
                 st.session_state["ultimo_resultado"] = resultado
@@ -1,63 +1,125 @@
+import os
 import streamlit as st
 import pandas as pd
-from io import BytesIO
+import tempfile
 
 from src.cliente_multi_unitario import (
+    MIN_LINHAS_PARALELO,
+    gerar_template_csv,
     gerar_template_excel,
+    gerar_template_parquet,
     processar_multi_unitario,
 )
-from src.dados_tarifarios import carregar_csv_aneel
+from src.exportar_resultados import exportar_excel, exportar_pacote
+from src.relatorios_lote import gerar_relatorios_zip
+from src.armazem_lotes import CONCLUIDO, MAX_TRABALHOS, id_trabalho, obter_armazem
+from src.dados_tarifarios import carregar_indice_tarifas
+from src.leitor_planilha import ler_previa
 from src.grafico import criar_grafico_economia
-from src.relatorio_pdf import gerar_relatorio
 from src.formatacao import formatar_moeda, formatar_percentual
 
 st.set_page_config(page_title="Multi Unitário", page_icon="⚡", layout="wide")
 st.title("📋 Processamento Multi Unitário")
-st.markdown("Processe várias unidades consumidoras de uma vez via upload de planilha Excel.")
+st.markdown(
+    "Processe várias unidades consumidoras de uma vez via upload de planilha "
+    "Excel, CSV (separado por ponto e vírgula, decimais com vírgula) ou Parquet."
+)
 
 # ---------------------------------------------------------------------------
 # Template download
 # ---------------------------------------------------------------------------
-st.download_button(
+tpl1, tpl2, tpl3 = st.columns(3)
+tpl1.download_button(
     "📥 Baixar Template Excel",
     data=gerar_template_excel(),
     file_name="template_multi_unitario.xlsx",
     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
 )
+tpl2.download_button(
+    "📥 Baixar Template CSV",
+    data=gerar_template_csv(),
+    file_name="template_multi_unitario.csv",
+    mime="text/csv",
+)
+tpl3.download_button(
+    "📥 Baixar Template Parquet",
+    data=gerar_template_parquet(),
+    file_name="template_multi_unitario.parquet",
+    mime="application/vnd.apache.parquet",
+)
 
 st.divider()
 
 # ---------------------------------------------------------------------------
 # Upload and process
 # ---------------------------------------------------------------------------
-arquivo = st.file_uploader("Upload da planilha preenchida (.xlsx)", type=["xlsx"])
+arquivo = st.file_uploader(
+    "Upload da planilha preenchida (.xlsx, .csv ou .parquet)", type=["xlsx", "csv", "parquet"]
+)
 
 if arquivo is not None:
-    try:
-        df_preview = pd.read_excel(arquivo, sheet_name="Unidades")
-    except Exception:
-        df_preview = pd.read_excel(arquivo)
+    df_preview, n_unidades = ler_previa(arquivo)
 
-    if len(df_preview) == 0:
+    if n_unidades == 0:
         st.warning("A planilha enviada está vazia. Adicione pelo menos uma unidade.")
     else:
-        st.markdown(f"**{len(df_preview)} unidade(s) encontrada(s)**")
+        st.markdown(f"**{n_unidades} unidade(s) encontrada(s)**")
+        if n_unidades > len(df_preview):
+            st.caption(f"Pré-visualização das primeiras {len(df_preview)} unidades.")
         st.dataframe(df_preview, hide_index=True, use_container_width=True)
 
+        # Batch job: the same file (and tariff data) resumes where it stopped
+        indice_tarifas = carregar_indice_tarifas()
+        armazem = obter_armazem()
+        trabalho = id_trabalho(arquivo, indice_tarifas.versao)
+        registro = armazem.trabalho(trabalho)
+        if registro is not None and registro["status"] == CONCLUIDO:
+            st.info(f"Esta planilha já foi processada (trabalho `{trabalho}`); os resultados serão carregados do histórico.")
+        elif registro is not None and registro["concluidas"]:
+            st.info(
+                f"Trabalho `{trabalho}` interrompido com {registro['concluidas']} de {registro['total']} "
+                "unidade(s) processada(s); o processamento continuará de onde parou."
+            )
+
+        formato_exportacao = st.selectbox(
+            "Exportação dos resultados",
+            ["Excel (resumo)", "Excel (resumo + detalhe mensal)", "Pacote Parquet (ZIP)", "Pacote CSV (ZIP)"],
+            help=(
+                "O detalhe mensal traz os custos ACR/ACL e seus componentes mês a mês para cada unidade. "
+                "Para carteiras grandes, o pacote Parquet é a opção mais rápida."
+            ),
+        )
+        gerar_pdfs = st.checkbox(
+            "Gerar relatório PDF de cada unidade (arquivo ZIP)",
+            help="Os relatórios são gerados em paralelo após o processamento.",
+        )
+
+        # Worker processes only pay off on very large sheets (see MIN_LINHAS_PARALELO)
+        paralelo = False
+        n_cpus = os.cpu_count() or 1
+        if n_unidades >= MIN_LINHAS_PARALELO and n_cpus > 1:
+            paralelo = st.checkbox(
+                f"Processar em paralelo ({n_cpus} processos)",
+                help="Inicia processos auxiliares (alguns segundos de preparação); vantajoso apenas em planilhas muito grandes.",
+            )
+
         if st.button("⚡ Processar Todas as Unidades", use_container_width=True):
-            df_tarifas = carregar_csv_aneel()
             progress = st.progress(0, text="Processando...")
 
             def atualizar_progresso(valor, texto):
                 progress.progress(valor, text=texto)
 
-            arquivo.seek(0)
             resultado = processar_multi_unitario(
-                arquivo.read(), df_tarifas, progress_callback=atualizar_progresso
+                arquivo, indice_tarifas, progress_callback=atualizar_progresso,
+                n_processos=None if paralelo else 1, armazem=armazem, trabalho=trabalho, manter_detalhe=gerar_pdfs,
             )
 
             progress.progress(1.0, text="Concluído!")
             st.toast("Processamento concluído!", icon="✅")
+            st.caption(
+                f"Trabalho `{resultado['trabalho']}` salvo no histórico"
+                + (f" ({resultado['retomadas']} unidade(s) retomada(s) de execução anterior)." if resultado["retomadas"] else ".")
+            )
 
             unidades = resultado["unidades"]
             consolidado = resultado["consolidado"]
@@ -81,57 +143,75 @@ if arquivo is not None:
             tc1, tc2 = st.columns(2)
             tc1.metric("Economia Total Consolidada", formatar_moeda(consolidado["total_economia"]))
             tc2.metric("Economia VPL Consolidada", formatar_moeda(consolidado["total_vpl"]))
+            # Lookup stats only cover this run's rows: hidden when units were resumed
+            if not resultado["retomadas"]:
+                st.caption(
+                    f"{consolidado['chaves_tarifarias']} combinação(ões) tarifária(s) distinta(s) "
+                    f"consultada(s) uma única vez em {consolidado['tempo_tarifas'] * 1000:.1f} ms."
+                )
 
             # Consolidated chart
-            valid_results = [r for r in unidades if "_resultado" in r]
-            if valid_results:
-                all_anos = set()
-                for r in valid_results:
-                    for a in r["_resultado"]["anos"]:
-                        all_anos.add(a)
-                anos_sorted = sorted(all_anos)
-
-                gastos_acl_total = []
-                economias_total = []
-                for ano in anos_sorted:
-                    acl_sum = 0.0
-                    eco_sum = 0.0
-                    for r in valid_results:
-                        res = r["_resultado"]
-                        for i, a in enumerate(res["anos"]):
-                            if a == ano:
-                                acl_sum += res["gastos_acl_anual"][i]
-                                eco_sum += res["economias_anual"][i]
-                    gastos_acl_total.append(acl_sum)
-                    economias_total.append(eco_sum)
-
-                fig_consolidado = criar_grafico_economia(gastos_acl_total, economias_total, anos_sorted)
+            anual = consolidado["anual"]
+            if not anual.empty:
+                fig_consolidado = criar_grafico_economia(
+                    anual["gasto_acl"].tolist(), anual["economia"].tolist(), [str(a) for a in anual.index],
+                )
                 fig_consolidado.update_layout(title="Economia Consolidada por Ano")
                 st.plotly_chart(fig_consolidado, use_container_width=True)
 
-            # Download results Excel
-            df_export = pd.DataFrame([
-                {
-                    "Nome": r["Nome"],
-                    "Distribuidora": r["Distribuidora"],
-                    "Desconto (%)": round(r["Desconto"] * 100, 2) if r["Desconto"] else 0,
-                    "Economia Total (R$)": round(r["Economia Total"], 2),
-                    "Economia VPL (R$)": round(r["Economia VPL"], 2),
-                    "Erro": r.get("_erro", ""),
-                }
-                for r in unidades
-            ])
+                st.subheader("Subtotais por Distribuidora")
+                distribuidoras = consolidado["distribuidoras"]
+                st.dataframe(
+                    pd.DataFrame({
+                        "Distribuidora": distribuidoras.index,
+                        "Unidades": distribuidoras["unidades"].to_numpy(),
+                        "Desconto": distribuidoras["desconto"].map(formatar_percentual).to_numpy(),
+                        "Economia Total": distribuidoras["economia"].map(formatar_moeda).to_numpy(),
+                        "Economia VPL": distribuidoras["economia_vpl"].map(formatar_moeda).to_numpy(),
+                    }),
+                    hide_index=True,
+                    use_container_width=True,
+                )
 
-            buf_res = BytesIO()
-            with pd.ExcelWriter(buf_res, engine="xlsxwriter") as writer:
-                df_export.to_excel(writer, index=False, sheet_name="Resultados")
-            st.download_button(
-                "📊 Baixar Resultados Excel",
-                data=buf_res.getvalue(),
-                file_name="resultados_multi_unitario.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True,
-            )
+            # Download results (streamed to a temporary file)
+            with tempfile.TemporaryFile() as arquivo_exportacao:
+                if formato_exportacao == "Pacote Parquet (ZIP)":
+                    exportar_pacote(unidades, arquivo_exportacao, "parquet")
+                    nome_exportacao, mime_exportacao = "resultados_multi_unitario_parquet.zip", "application/zip"
+                elif formato_exportacao == "Pacote CSV (ZIP)":
+                    exportar_pacote(unidades, arquivo_exportacao, "csv")
+                    nome_exportacao, mime_exportacao = "resultados_multi_unitario_csv.zip", "application/zip"
+                else:
+                    exportar_excel(unidades, arquivo_exportacao, detalhe=formato_exportacao != "Excel (resumo)")
+                    nome_exportacao = "resultados_multi_unitario.xlsx"
+                    mime_exportacao = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                arquivo_exportacao.seek(0)
+                st.download_button(
+                    "📊 Baixar Resultados",
+                    data=arquivo_exportacao.read(),
+                    file_name=nome_exportacao,
+                    mime=mime_exportacao,
+                    use_container_width=True,
+                )
+
+            # Per-unit PDF reports, streamed into a ZIP on disk
+            if gerar_pdfs:
+                progresso_pdf = st.progress(0, text="Gerando relatórios...")
+                with tempfile.TemporaryFile() as arquivo_zip:
+                    n_relatorios = gerar_relatorios_zip(
+                        unidades, arquivo_zip,
+                        progress_callback=lambda valor, texto: progresso_pdf.progress(valor, text=texto),
+                    )
+                    progresso_pdf.progress(1.0, text=f"{n_relatorios} relatório(s) gerado(s)")
+                    arquivo_zip.seek(0)
+                    st.download_button(
+                        "📄 Baixar Relatórios PDF (ZIP)",
+                        data=arquivo_zip.read(),
+                        file_name="relatorios_multi_unitario.zip",
+                        mime="application/zip",
+                        use_container_width=True,
+                        disabled=n_relatorios == 0,
+                    )
 
             # Show errors
             erros = [r for r in unidades if "_erro" in r]
@@ -139,3 +219,38 @@ if arquivo is not None:
                 st.warning(f"{len(erros)} unidade(s) com erro:")
                 for r in erros:
                     st.error(f"**{r['Nome']}**: {r['_erro']}")
+
+# ---------------------------------------------------------------------------
+# Job history
+# ---------------------------------------------------------------------------
+st.divider()
+with st.expander("🗂️ Histórico de Processamentos"):
+    armazem = obter_armazem()
+    df_trabalhos = armazem.trabalhos()
+    if df_trabalhos.empty:
+        st.caption("Nenhum processamento salvo.")
+    else:
+        st.dataframe(
+            df_trabalhos.assign(
+                economia_total=df_trabalhos["economia_total"].map(formatar_moeda),
+                economia_vpl=df_trabalhos["economia_vpl"].map(formatar_moeda),
+            ).rename(columns={
+                "id": "Trabalho",
+                "criado_em": "Criado em",
+                "atualizado_em": "Atualizado em",
+                "status": "Status",
+                "concluidas": "Unidades",
+                "total": "Total",
+                "economia_total": "Economia Total",
+                "economia_vpl": "Economia VPL",
+                "erros": "Erros",
+            }),
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption(f"Os {MAX_TRABALHOS} processamentos mais recentes são mantidos.")
+        selecionado = st.selectbox("Ver unidades do trabalho", df_trabalhos["id"].tolist())
+        st.dataframe(armazem.consultar(selecionado), hide_index=True, use_container_width=True)
+        if st.button("🗑️ Remover trabalho do histórico"):
+            armazem.remover(selecionado)
+            st.rerun()
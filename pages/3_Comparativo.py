@@ -12,13 +12,13 @@ from src.models import (
     ParametrosSimulacao,
 )
 from src.dados_tarifarios import (
-    carregar_csv_aneel,
+    carregar_indice_tarifas,
     listar_distribuidoras,
     listar_subgrupos,
     listar_modalidades,
     obter_tarifas_vigentes,
 )
-from src.logica_calculadora import LogicaCalculadora
+from src.cache_simulacao import calcular_simulacao
 from src.grafico import criar_grafico_comparativo
 from src.formatacao import formatar_moeda, formatar_percentual
 
@@ -26,8 +26,8 @@ st.set_page_config(page_title="Comparativo", page_icon="⚡", layout="wide")
 st.title("🔀 Comparativo de Cenários")
 st.markdown("Compare dois cenários lado a lado para avaliar diferentes condições de contrato.")
 
-df_tarifas = carregar_csv_aneel()
-distribuidoras = listar_distribuidoras(df_tarifas)
+indice_tarifas = carregar_indice_tarifas()
+distribuidoras = listar_distribuidoras(indice_tarifas)
 
 
 def render_form(key_prefix: str, label: str):
@@ -35,12 +35,12 @@ def render_form(key_prefix: str, label: str):
     st.markdown(f"### {label}")
 
     distribuidora = st.selectbox("Distribuidora", distribuidoras, key=f"{key_prefix}_dist")
-    subgrupos = listar_subgrupos(df_tarifas, distribuidora)
+    subgrupos = listar_subgrupos(indice_tarifas, distribuidora)
     subgrupo = st.selectbox("SubGrupo", subgrupos, key=f"{key_prefix}_sg")
-    modalidades = listar_modalidades(df_tarifas, distribuidora, subgrupo)
+    modalidades = listar_modalidades(indice_tarifas, distribuidora, subgrupo)
     modalidade = st.selectbox("Modalidade", modalidades, key=f"{key_prefix}_mod")
 
-    tarifas = obter_tarifas_vigentes(df_tarifas, distribuidora, subgrupo, modalidade)
+    tarifas = obter_tarifas_vigentes(indice_tarifas, distribuidora, subgrupo, modalidade)
 
     if tarifas.tusd_kw_fp == 0.0 and tarifas.te_fp == 0.0:
         st.warning(
@@ -189,8 +189,8 @@ if st.button("🔀 Comparar Cenários", use_container_width=True):
             params_a = build_params(dados_a)
             params_b = build_params(dados_b)
 
-            resultado_a = LogicaCalculadora(params_a).calcular()
-            resultado_b = LogicaCalculadora(params_b).calcular()
+            resultado_a = calcular_simulacao(params_a, indice_tarifas.versao)
+            resultado_b = calcular_simulacao(params_b, indice_tarifas.versao)
 
             label_a = f"Cenário A ({dados_a['distribuidora']} - {dados_a['tipo_oferta']})"
             label_b = f"Cenário B ({dados_b['distribuidora']} - {dados_b['tipo_oferta']})"
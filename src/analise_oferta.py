@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+from src.models import ParametrosSimulacao
+from src.logica_calculadora import LogicaCalculadora, preparar_calculadora
+
+
+def _energia_pd(calc: LogicaCalculadora, escadas: list[list[float]]) -> np.ndarray:
+    """(G, M) grossed-up PD energy price for G price ladders."""
+    n_meses = len(calc.year_idx)
+    energia = np.empty((len(escadas), n_meses))
+    for g, precos in enumerate(escadas):
+        if len(precos):
+            precos = np.asarray(precos, dtype=float)
+            energia[g] = calc._bruto_pd(precos[np.minimum(calc.year_idx, len(precos) - 1)])
+        else:
+            energia[g] = calc._bruto_pd(calc.energia_cg)
+    return energia
+
+
+def _agregar_grade(
+    calc: LogicaCalculadora, energia_final: np.ndarray, taxas_vpl: np.ndarray
+) -> dict:
+    """Totals and NPV for G offers (rows of energia_final) × T NPV rates."""
+    custo_acr = calc.acr["custo_total_acr"]
+    custo_acl = calc.fio_acl + energia_final + calc.despesas_ccee
+    economia = (custo_acr - custo_acl) * calc.consumo_total_mwh
+    gasto_acr_total = float((custo_acr * calc.consumo_total_mwh).sum())
+    gasto_acl_total = (custo_acl * calc.consumo_total_mwh).sum(axis=1)
+
+    if gasto_acr_total != 0:
+        desconto_geral = 1 - gasto_acl_total / gasto_acr_total
+    else:
+        desconto_geral = np.zeros(len(energia_final))
+
+    # Annual savings via a (months × years) one-hot matrix
+    anos_unicos, posicao = np.unique(calc.anos, return_inverse=True)
+    por_ano = np.zeros((len(calc.anos), len(anos_unicos)))
+    por_ano[np.arange(len(calc.anos)), posicao] = 1.0
+    economia_anual = economia @ por_ano
+
+    taxa_mensal = (1 + taxas_vpl / 100.0) ** (1.0 / 12.0) - 1.0
+    taxa_anual = (1 + taxa_mensal) ** 12 - 1
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        descontos_vpl = (1 + taxa_anual[:, None]) ** np.arange(len(anos_unicos))[None, :]
+        vpl = economia_anual @ (1.0 / descontos_vpl).T
+    soma = economia_anual.sum(axis=1)[:, None]
+    usar_vpl = (len(anos_unicos) > 0) & (taxa_anual[None, :] > 0) & np.isfinite(vpl)
+
+    return {
+        "desconto_geral": desconto_geral,
+        "economia_total": economia.sum(axis=1),
+        "economia_vpl": np.where(usar_vpl, vpl, soma),
+    }
+
+
+def varrer_oferta(
+    params: ParametrosSimulacao,
+    descontos=None,
+    escadas_precos: list[list[float]] | None = None,
+    taxas_vpl=None,
+) -> pd.DataFrame:
+    """Savings over a grid of offers × NPV rates for one consumer.
+
+    The ACR side and the offer-independent ACL wire cost are computed once;
+    only the energy price is broadcast across the grid.
+
+    Args:
+        params: Base simulation; its offer/rate are used for omitted axes.
+        descontos: desconto_garantido values (%) → DG offers.
+        escadas_precos: precos_por_ano ladders → PD offers (used instead of
+            descontos when given).
+        taxas_vpl: annual NPV rates (%).
+
+    Returns:
+        One row per (offer, rate): tipo_oferta, oferta (label),
+        desconto_garantido, precos_por_ano, taxa_vpl, desconto_geral,
+        economia_total, economia_vpl.
+    """
+    calc = preparar_calculadora(params)
+
+    if escadas_precos is None and descontos is None:
+        if calc.tipo_oferta == "Desconto Garantido":
+            descontos = [calc.desconto_garantido]
+        else:
+            escadas_precos = [calc.precos_por_ano]
+
+    if escadas_precos is not None:
+        tipo_oferta = "Preço Determinado"
+        escadas = [list(map(float, e)) for e in escadas_precos]
+        energia_final = _energia_pd(calc, escadas)
+        descontos_col = [None] * len(escadas)
+        rotulos = [" / ".join(f"{p:g}" for p in e) for e in escadas]
+    else:
+        tipo_oferta = "Desconto Garantido"
+        descontos_arr = np.asarray(descontos, dtype=float)
+        energia_final = calc.energia_cg[None, :] * (1 - descontos_arr[:, None] / 100.0)
+        escadas = [None] * len(descontos_arr)
+        descontos_col = descontos_arr.tolist()
+        rotulos = [f"{d:g}%" for d in descontos_arr]
+
+    taxas = np.asarray(
+        [params.contrato.taxa_vpl] if taxas_vpl is None else taxas_vpl, dtype=float
+    )
+    grade = _agregar_grade(calc, energia_final, taxas)
+
+    n_ofertas, n_taxas = len(rotulos), len(taxas)
+    # Object column of lists (np.array would try to build a 2-D array)
+    precos_col = np.empty(n_ofertas, dtype=object)
+    precos_col[:] = escadas
+    return pd.DataFrame({
+        "tipo_oferta": tipo_oferta,
+        "oferta": np.repeat(rotulos, n_taxas),
+        "desconto_garantido": np.repeat(np.array(descontos_col, dtype=object), n_taxas),
+        "precos_por_ano": np.repeat(precos_col, n_taxas),
+        "taxa_vpl": np.tile(taxas, n_ofertas),
+        "desconto_geral": np.repeat(grade["desconto_geral"], n_taxas),
+        "economia_total": np.repeat(grade["economia_total"], n_taxas),
+        "economia_vpl": grade["economia_vpl"].ravel(),
+    })
+
+
+METRICAS_ALVO = ("desconto_geral", "economia_total", "economia_vpl")
+
+
+def _resolver_monotono(avaliar, lo: float, hi: float | None, alvo: float, crescente: bool) -> float | None:
+    """Extreme x with avaliar(x) >= alvo for a monotone metric.
+
+    crescente=True: metric grows with x, return the smallest x in [lo, hi].
+    crescente=False: metric falls with x, return the largest x >= lo
+    (hi=None: unbounded above).
+
+    avaliar maps an array of x to an array of metric values. The metrics
+    here are affine in the offer variable, so two evaluations give the
+    answer; a midpoint check guards that assumption and falls back to a
+    vectorized bisection (33 points per round) when it does not hold.
+    """
+    if hi is None:
+        # Bracket the root: the metric must drop below the target
+        hi = max(lo, 1.0) * 2
+        for _ in range(64):
+            if avaliar(np.array([hi]))[0] < alvo:
+                break
+            hi *= 2
+        else:
+            return None
+
+    f_lo, f_meio, f_hi = avaliar(np.array([lo, (lo + hi) / 2, hi]))
+    if crescente:
+        if f_lo >= alvo:
+            return lo
+        if f_hi < alvo:
+            return None
+    else:
+        if f_lo < alvo:
+            return None
+        if f_hi >= alvo:
+            return hi
+
+    escala = max(abs(f_lo), abs(f_hi), 1.0)
+    if abs(f_meio - (f_lo + f_hi) / 2) <= 1e-9 * escala:
+        return lo + (alvo - f_lo) * (hi - lo) / (f_hi - f_lo)
+
+    for _ in range(12):
+        xs = np.linspace(lo, hi, 33)
+        atinge = avaliar(xs) >= alvo
+        if crescente:
+            k = int(np.argmax(atinge))  # first x reaching the target
+            lo, hi = xs[max(k - 1, 0)], xs[k]
+        else:
+            k = len(xs) - 1 - int(np.argmax(atinge[::-1]))  # last x reaching it
+            lo, hi = xs[k], xs[min(k + 1, len(xs) - 1)]
+        if hi - lo <= 1e-9 * max(abs(hi), 1.0):
+            break
+    return hi if crescente else lo
+
+
+def resolver_desconto_minimo(
+    params: ParametrosSimulacao, alvo: float, metrica: str = "desconto_geral"
+) -> float | None:
+    """Smallest desconto_garantido (%) whose DG offer reaches `alvo`.
+
+    metrica: 'desconto_geral' (fraction, e.g. 0.15), 'economia_total' or
+    'economia_vpl' (R$, at the contract's taxa_vpl). None if even 100% does
+    not reach the target.
+    """
+    if metrica not in METRICAS_ALVO:
+        raise ValueError(f"Métrica inválida: '{metrica}'. Valores aceitos: {', '.join(METRICAS_ALVO)}")
+    calc = preparar_calculadora(params)
+    taxas = np.array([params.contrato.taxa_vpl], dtype=float)
+
+    def avaliar(descontos: np.ndarray) -> np.ndarray:
+        energia_final = calc.energia_cg[None, :] * (1 - descontos[:, None] / 100.0)
+        return np.ravel(_agregar_grade(calc, energia_final, taxas)[metrica])
+
+    return _resolver_monotono(avaliar, 0.0, 100.0, alvo, crescente=True)
+
+
+def resolver_preco_maximo(
+    params: ParametrosSimulacao,
+    alvo: float,
+    metrica: str = "desconto_geral",
+    forma: list[float] | None = None,
+) -> list[float] | None:
+    """Highest PD price ladder whose offer still reaches `alvo`.
+
+    forma: relative shape of precos_por_ano (e.g. [1.0, 1.05, 1.10]); the
+    ladder returned is forma scaled by the largest feasible factor. The
+    default [1.0] gives a single flat price. None if even a zero price
+    misses the target.
+    """
+    if metrica not in METRICAS_ALVO:
+        raise ValueError(f"Métrica inválida: '{metrica}'. Valores aceitos: {', '.join(METRICAS_ALVO)}")
+    calc = preparar_calculadora(params)
+    taxas = np.array([params.contrato.taxa_vpl], dtype=float)
+    forma = np.asarray(forma or [1.0], dtype=float)
+
+    def avaliar(escalas: np.ndarray) -> np.ndarray:
+        energia_final = _energia_pd(calc, [forma * s for s in escalas])
+        return np.ravel(_agregar_grade(calc, energia_final, taxas)[metrica])
+
+    escala = _resolver_monotono(avaliar, 0.0, None, alvo, crescente=False)
+    if escala is None:
+        return None
+    return (forma * escala).tolist()
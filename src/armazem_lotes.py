@@ -0,0 +1,242 @@
+import hashlib
+import math
+import os
+import sqlite3
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from typing import BinaryIO
+
+import pandas as pd
+import streamlit as st
+
+from src.dados_tarifarios import SNAPSHOT_DIR
+
+ARQUIVO_LOTES = os.path.join(SNAPSHOT_DIR, "lotes.sqlite")
+MAX_TRABALHOS = 20  # most recent jobs kept; older ones are removed
+_LOTE_SQL = 500  # host parameters per IN (...) query
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabalhos (
+    id TEXT PRIMARY KEY,
+    criado_em TEXT NOT NULL,
+    atualizado_em TEXT NOT NULL,
+    versao_dados TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    concluidas INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    economia_total REAL NOT NULL DEFAULT 0,
+    economia_vpl REAL NOT NULL DEFAULT 0,
+    erros INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS unidades (
+    trabalho_id TEXT NOT NULL REFERENCES trabalhos(id) ON DELETE CASCADE,
+    linha INTEGER NOT NULL,
+    nome TEXT,
+    distribuidora TEXT,
+    desconto REAL,
+    economia_total REAL,
+    economia_vpl REAL,
+    erro TEXT,
+    parametros TEXT,
+    PRIMARY KEY (trabalho_id, linha)
+);
+"""
+
+# Running totals kept on each trabalhos row (stores created before they
+# existed get them added and backfilled)
+_TOTAIS_TRABALHO = {
+    "economia_total": "REAL NOT NULL DEFAULT 0",
+    "economia_vpl": "REAL NOT NULL DEFAULT 0",
+    "erros": "INTEGER NOT NULL DEFAULT 0",
+}
+
+EM_ANDAMENTO = "em_andamento"
+CONCLUIDO = "concluido"
+
+
+def id_trabalho(arquivo: bytes | BinaryIO, versao_dados: str = "") -> str:
+    """Job ID of an upload: SHA-256 of its content + the tariff dataset
+    version, so re-sending the same file resumes the same job."""
+    if not isinstance(arquivo, (bytes, bytearray)):
+        arquivo.seek(0)
+        conteudo = arquivo.read()
+        arquivo.seek(0)
+    else:
+        conteudo = arquivo
+    return hashlib.sha256(versao_dados.encode() + b"\n" + conteudo).hexdigest()[:16]
+
+
+def _agora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class ArmazemLotes:
+    """Local SQLite store of multi-unit batch jobs.
+
+    Each job keeps one row per processed sheet line: the summary columns
+    (queryable with plain SQL or consultar()) and, for valid units, the
+    ParametrosSimulacao as JSON. Results are not stored: they are a pure
+    function of the parameters and calcular_lote rebuilds them in one pass
+    on resume. gravar() writes a whole block in one transaction, so
+    checkpointing costs one commit per block, and keeps the job's totals
+    (concluidas, economia_total, economia_vpl, erros) on its trabalhos
+    row, so listing jobs never scans the units. Only the max_trabalhos
+    most recent jobs are kept.
+    Connections are opened per call, so one store can serve every
+    Streamlit session thread.
+    """
+
+    def __init__(self, caminho: str = ARQUIVO_LOTES, max_trabalhos: int = MAX_TRABALHOS):
+        self.caminho = caminho
+        self.max_trabalhos = max_trabalhos
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_ESQUEMA)
+            _migrar(con)
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        """Connection committed on success (rolled back on error) and closed."""
+        con = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            con.execute("PRAGMA foreign_keys=ON")
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def iniciar(self, trabalho: str, versao_dados: str, total: int) -> None:
+        """Create the job (no-op if it already exists), removing the oldest
+        jobs beyond max_trabalhos."""
+        agora = _agora()
+        with self._conectar() as con:
+            con.execute(
+                "INSERT OR IGNORE INTO trabalhos (id, criado_em, atualizado_em, versao_dados, total, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (trabalho, agora, agora, versao_dados, total, EM_ANDAMENTO),
+            )
+            con.execute(
+                "DELETE FROM trabalhos WHERE id != ? AND id NOT IN "
+                "(SELECT id FROM trabalhos WHERE id != ? ORDER BY atualizado_em DESC LIMIT ?)",
+                (trabalho, trabalho, self.max_trabalhos - 1),
+            )
+
+    def trabalho(self, trabalho: str) -> dict | None:
+        with self._conectar() as con:
+            con.row_factory = sqlite3.Row
+            linha = con.execute("SELECT * FROM trabalhos WHERE id = ?", (trabalho,)).fetchone()
+        return dict(linha) if linha else None
+
+    def gravar(self, trabalho: str, unidades: Iterable[tuple[int, dict]]) -> None:
+        """Checkpoint (sheet line, unit entry) pairs in one transaction."""
+        registros = [
+            (
+                trabalho,
+                int(linha),
+                None if isinstance(u["Nome"], float) and math.isnan(u["Nome"]) else str(u["Nome"]),
+                u["Distribuidora"],
+                u["Desconto"],
+                u["Economia Total"],
+                u["Economia VPL"],
+                u.get("_erro"),
+                u["_params"].model_dump_json() if "_params" in u else None,
+            )
+            for linha, u in unidades
+        ]
+        linhas = [r[1] for r in registros]
+        with self._conectar() as con:
+            # Lines written again replace their old rows: take those out of
+            # the totals before adding the new ones
+            antes = [0, 0.0, 0.0, 0]
+            for i in range(0, len(linhas), _LOTE_SQL):
+                parte = linhas[i:i + _LOTE_SQL]
+                substituidas = con.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(economia_total), 0), COALESCE(SUM(economia_vpl), 0), "
+                    f"COUNT(erro) FROM unidades WHERE trabalho_id = ? AND linha IN ({', '.join('?' * len(parte))})",
+                    (trabalho, *parte),
+                ).fetchone()
+                antes = [a + b for a, b in zip(antes, substituidas)]
+            con.executemany(
+                "INSERT OR REPLACE INTO unidades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", registros
+            )
+            con.execute(
+                "UPDATE trabalhos SET concluidas = concluidas + ?, economia_total = economia_total + ?, "
+                "economia_vpl = economia_vpl + ?, erros = erros + ?, atualizado_em = ? WHERE id = ?",
+                (
+                    len(registros) - antes[0],
+                    _somar(r[5] for r in registros) - antes[1],
+                    _somar(r[6] for r in registros) - antes[2],
+                    sum(r[7] is not None for r in registros) - antes[3],
+                    _agora(),
+                    trabalho,
+                ),
+            )
+
+    def finalizar(self, trabalho: str) -> None:
+        with self._conectar() as con:
+            con.execute(
+                "UPDATE trabalhos SET status = ?, total = concluidas, atualizado_em = ? WHERE id = ?",
+                (CONCLUIDO, _agora(), trabalho),
+            )
+
+    def unidades(self, trabalho: str) -> list[tuple]:
+        """Stored (linha, nome, distribuidora, erro, parametros JSON) rows of
+        a job, in sheet order (for resuming)."""
+        with self._conectar() as con:
+            return con.execute(
+                "SELECT linha, nome, distribuidora, erro, parametros FROM unidades "
+                "WHERE trabalho_id = ? ORDER BY linha",
+                (trabalho,),
+            ).fetchall()
+
+    def consultar(self, trabalho: str) -> pd.DataFrame:
+        """Per-unit summary of a job, in sheet order."""
+        with self._conectar() as con:
+            return pd.read_sql_query(
+                "SELECT linha, nome, distribuidora, desconto, economia_total, economia_vpl, erro "
+                "FROM unidades WHERE trabalho_id = ? ORDER BY linha",
+                con, params=(trabalho,),
+            )
+
+    def trabalhos(self) -> pd.DataFrame:
+        """Every job with its totals, most recent first (trabalhos table only)."""
+        with self._conectar() as con:
+            return pd.read_sql_query(
+                "SELECT id, criado_em, atualizado_em, status, concluidas, total, "
+                "economia_total, economia_vpl, erros "
+                "FROM trabalhos ORDER BY atualizado_em DESC",
+                con,
+            )
+
+    def remover(self, trabalho: str) -> None:
+        with self._conectar() as con:
+            con.execute("DELETE FROM trabalhos WHERE id = ?", (trabalho,))
+
+
+def _somar(valores: Iterable[float | None]) -> float:
+    """Sum as SQLite's SUM sees the stored values (NULL/NaN skipped)."""
+    return sum(v for v in valores if v is not None and not math.isnan(v))
+
+
+def _migrar(con: sqlite3.Connection) -> None:
+    """Add and backfill the trabalhos totals in stores created without them."""
+    colunas = {linha[1] for linha in con.execute("PRAGMA table_info(trabalhos)")}
+    faltantes = [c for c in _TOTAIS_TRABALHO if c not in colunas]
+    if not faltantes:
+        return
+    for coluna in faltantes:
+        con.execute(f"ALTER TABLE trabalhos ADD COLUMN {coluna} {_TOTAIS_TRABALHO[coluna]}")
+    con.execute(
+        "UPDATE trabalhos SET "
+        "economia_total = (SELECT COALESCE(SUM(economia_total), 0) FROM unidades WHERE trabalho_id = trabalhos.id), "
+        "economia_vpl = (SELECT COALESCE(SUM(economia_vpl), 0) FROM unidades WHERE trabalho_id = trabalhos.id), "
+        "erros = (SELECT COUNT(erro) FROM unidades WHERE trabalho_id = trabalhos.id)"
+    )
+
+
+@st.cache_resource
+def obter_armazem(caminho: str = ARQUIVO_LOTES) -> ArmazemLotes:
+    """Process-wide ArmazemLotes (one SQLite file for every session)."""
+    return ArmazemLotes(caminho)
@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """Bounded LRU cache: past max_itens entries, the least recently used
+    one is evicted. Counts hits and misses for estatisticas().
+
+    Thread-safe: Streamlit runs each session in its own thread.
+    """
+
+    def __init__(self, max_itens: int):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def buscar(self, chave: str):
+        """Cached value for chave (marking it most recent), or None."""
+        with self._lock:
+            valor = self._itens.get(chave)
+            if valor is None:
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def guardar(self, chave: str, valor):
+        """Store valor, evicting the least recently used; returns valor."""
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return valor
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "itens": len(self._itens),
+            "max_itens": self.max_itens,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+        }
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            self.acertos = 0
+            self.falhas = 0
@@ -0,0 +1,121 @@
+import hashlib
+from collections.abc import Mapping
+
+import numpy as np
+import streamlit as st
+from pydantic import BaseModel
+
+from src.cache_lru import CacheLRU
+from src.models import ParametrosSimulacao, TarifasCongeladas, TarifasVigentes
+from src.logica_calculadora import LogicaCalculadora
+from src.resultado_simulacao import ERRO_SOMENTE_LEITURA, ResultadoSimulacao
+
+CACHE_MAX_ITENS = 256
+CACHE_COMPARTILHADO = True  # one cache for every session in the process
+
+
+class ResultadoImutavel(dict):
+    """Read-only dict: cached results are shared, so writes raise TypeError.
+
+    dict(resultado) gives a mutable (shallow) copy.
+    """
+
+    def _somente_leitura(self, *args, **kwargs):
+        raise TypeError(ERRO_SOMENTE_LEITURA)
+
+    __setitem__ = __delitem__ = __ior__ = _somente_leitura
+    clear = pop = popitem = setdefault = update = _somente_leitura
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+def congelar(valor):
+    """Deep read-only copy: ResultadoSimulacao → frozen copy
+    (somente_leitura), dicts → ResultadoImutavel, lists → tuples,
+    arrays → non-writeable, TarifasVigentes → TarifasCongeladas."""
+    if isinstance(valor, ResultadoSimulacao):
+        return valor.somente_leitura()
+    if isinstance(valor, dict):
+        return ResultadoImutavel({k: congelar(v) for k, v in valor.items()})
+    if isinstance(valor, (list, tuple)):
+        return tuple(congelar(v) for v in valor)
+    if isinstance(valor, np.ndarray):
+        valor = valor.view()
+        valor.flags.writeable = False
+        return valor
+    if isinstance(valor, TarifasVigentes):
+        return TarifasCongeladas(**valor.model_dump())
+    if isinstance(valor, BaseModel):
+        return valor.model_copy(deep=True)
+    return valor
+
+
+def chave_simulacao(params: ParametrosSimulacao, versao_dados: str = "") -> str:
+    """Stable key: SHA-256 of the canonical params JSON + tariff dataset version.
+
+    DadosCliente (name/CNPJ) does not enter the calculation, so identical
+    units with different names share one entry.
+    """
+    canonico = params.model_dump_json(exclude={"cliente"})
+    return hashlib.sha256(f"{versao_dados}\n{canonico}".encode()).hexdigest()
+
+
+class CacheSimulacao(CacheLRU):
+    """Bounded LRU cache of LogicaCalculadora results.
+
+    Entries are frozen with congelar() before being stored, so one result
+    can be handed to several callers safely.
+    """
+
+    def __init__(self, max_itens: int = CACHE_MAX_ITENS):
+        super().__init__(max_itens)
+
+    def guardar(self, chave: str, resultado: Mapping) -> Mapping:
+        """Freeze and store resultado, evicting the least recently used."""
+        return super().guardar(chave, congelar(resultado))
+
+    def calcular(
+        self,
+        params: ParametrosSimulacao,
+        versao_dados: str = "",
+        calculadora: LogicaCalculadora | None = None,
+    ) -> Mapping:
+        """LogicaCalculadora(params).calcular(), served from the cache when possible.
+
+        On a miss, a given calculadora is updated incrementally
+        (LogicaCalculadora.atualizar) instead of starting from scratch.
+        """
+        chave = chave_simulacao(params, versao_dados)
+        resultado = self.buscar(chave)
+        if resultado is None:
+            if calculadora is not None:
+                resultado = calculadora.atualizar(params)
+            else:
+                resultado = LogicaCalculadora(params).calcular()
+            resultado = self.guardar(chave, resultado)
+        return resultado
+
+
+@st.cache_resource
+def _cache_processo(max_itens: int = CACHE_MAX_ITENS) -> CacheSimulacao:
+    return CacheSimulacao(max_itens)
+
+
+def obter_cache(compartilhado: bool = CACHE_COMPARTILHADO) -> CacheSimulacao:
+    """Process-wide cache (shared by all sessions) or one per session."""
+    if compartilhado:
+        return _cache_processo()
+    if "cache_simulacao" not in st.session_state:
+        st.session_state["cache_simulacao"] = CacheSimulacao()
+    return st.session_state["cache_simulacao"]
+
+
+def calcular_simulacao(
+    params: ParametrosSimulacao,
+    versao_dados: str = "",
+    calculadora: LogicaCalculadora | None = None,
+) -> Mapping:
+    """Cached simulation result, frozen by congelar(): a read-only
+    ResultadoSimulacao (or ResultadoImutavel for the scalar engine)."""
+    return obter_cache().calcular(params, versao_dados, calculadora)
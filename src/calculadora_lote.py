@@ -0,0 +1,350 @@
+import numpy as np
+import pandas as pd
+
+from src.constantes import TIPO_ENERGIA, TIPO_ICMS, MESES_PT, REAJUSTE_ANUAL_PADRAO
+from src.models import (
+    DadosCliente,
+    DadosConsumo,
+    DadosContrato,
+    DadosOferta,
+    DadosTributarios,
+    ParametrosSimulacao,
+    TarifasVigentes,
+)
+from src.dados_tarifarios import COMPONENTES_TARIFA
+from src.logica_calculadora import MAX_MESES, COMPONENTES_ACR, COMPONENTES_ACL
+from src.resultado_simulacao import ResultadoSimulacao, COLUNAS_MENSAIS, COLUNAS_ANUAIS
+
+# Column-oriented form of ParametrosSimulacao: one row per unit, one column
+# per (flattened) model field. precos_por_ano holds a list per row.
+COLUNAS_PARAMETROS = [
+    "nome",
+    "distribuidora",
+    "subgrupo",
+    "modalidade",
+    "demanda_hp_kw",
+    "demanda_hfp_kw",
+    "consumo_hp_kwh",
+    "consumo_hfp_kwh",
+    "aliquota_icms",
+    "aliquota_pis_cofins",
+    "tipo_energia",
+    "despesas_ccee",
+    "tipo_icms",
+    "mes_inicio",
+    "ano_inicio",
+    "mes_fim",
+    "ano_fim",
+    "taxa_vpl",
+    "tipo_oferta",
+    "desconto_garantido",
+    "precos_por_ano",
+    *COMPONENTES_TARIFA,
+    "vigencia",
+]
+
+
+def tabela_parametros(params: list[ParametrosSimulacao]) -> pd.DataFrame:
+    """ParametrosSimulacao list → column-oriented table (COLUNAS_PARAMETROS)."""
+    linhas = []
+    for p in params:
+        linhas.append({
+            "nome": p.cliente.nome,
+            "distribuidora": p.distribuidora,
+            "subgrupo": p.subgrupo,
+            "modalidade": p.modalidade,
+            **p.consumo.model_dump(),
+            **p.tributarios.model_dump(),
+            **p.contrato.model_dump(),
+            **p.oferta.model_dump(),
+            **p.tarifas.model_dump(),
+        })
+    return pd.DataFrame(linhas, columns=COLUNAS_PARAMETROS)
+
+
+def parametros_do_registro(r: dict) -> ParametrosSimulacao:
+    """Inverse of tabela_parametros for one row (as a dict): a validated
+    ParametrosSimulacao."""
+    is_dg = r["tipo_oferta"] == "Desconto Garantido"
+    return ParametrosSimulacao(
+        consumo=DadosConsumo(**{c: r[c] for c in DadosConsumo.model_fields}),
+        tributarios=DadosTributarios(**{c: r[c] for c in DadosTributarios.model_fields}),
+        contrato=DadosContrato(**{c: r[c] for c in DadosContrato.model_fields}),
+        oferta=DadosOferta(
+            tipo_oferta=r["tipo_oferta"],
+            desconto_garantido=r["desconto_garantido"] if is_dg else None,
+            precos_por_ano=None if is_dg else r["precos_por_ano"],
+        ),
+        cliente=DadosCliente(nome=r["nome"]),
+        distribuidora=r["distribuidora"],
+        subgrupo=r["subgrupo"],
+        modalidade=r["modalidade"],
+        tarifas=TarifasVigentes(**{c: r[c] for c in COMPONENTES_TARIFA}, vigencia=r["vigencia"]),
+    )
+
+
+def calcular_lote(entrada: list[ParametrosSimulacao] | pd.DataFrame) -> dict:
+    """LogicaCalculadora for N units at once, as (units × months) arrays.
+
+    `entrada` is a list of ParametrosSimulacao or a tabela_parametros-style
+    DataFrame. Units with different periods share one month axis of width
+    max(months); `mascara` marks each unit's real months and every value
+    outside it is zero. Azul/Verde, DG/PD and the ICMS types are selected
+    per unit with masks, following LogicaCalculadora formula by formula.
+
+    Returns:
+        parametros: the input table
+        periodo: ['Mmm/AAAA' start, end] per unit
+        tarifas (N, 6) COMPONENTES_TARIFA, vigencia: list
+        n_meses (N,), meses / anos / mascara (N, M)
+        acr / acl: {component: (N, M)} (keys as acr_detalhado/acl_detalhado)
+        custo_acr_mwh, custo_acl_mwh, desconto, economia, gasto_acr,
+        gasto_acl: (N, M)
+        anual: {ano, gasto_acr, gasto_acl, economia, desconto, meses,
+                mascara}: (N, Y)
+        desconto_geral, economia_total, economia_vpl: (N,)
+    """
+    tab = entrada if isinstance(entrada, pd.DataFrame) else tabela_parametros(entrada)
+    tab = tab.reset_index(drop=True)
+    n_unidades = len(tab)
+
+    def col(nome: str, dtype=float) -> np.ndarray:
+        return tab[nome].to_numpy(dtype=dtype)[:, None]
+
+    # --- _preparar_dados ---
+    dem_hp = col("demanda_hp_kw")
+    dem_hfp = col("demanda_hfp_kw")
+    consumo_hp = col("consumo_hp_kwh")
+    consumo_total_kwh = consumo_hp + col("consumo_hfp_kwh")
+    consumo_total_kwh = np.where(consumo_total_kwh == 0, 1.0, consumo_total_kwh)
+    consumo_total_mwh = consumo_total_kwh / 1000.0
+    prop_hp = consumo_hp / consumo_total_kwh
+    prop_hfp = 1.0 - prop_hp
+
+    aliq_icms = col("aliquota_icms") / 100.0
+    aliq_pis = col("aliquota_pis_cofins") / 100.0
+    despesas_ccee = col("despesas_ccee")
+
+    taxa_mensal_vpl = (1 + col("taxa_vpl") / 100.0) ** (1.0 / 12.0) - 1.0
+    num_energia = tab["tipo_energia"].map(TIPO_ENERGIA).to_numpy(dtype=float)[:, None]
+    num_icms = tab["tipo_icms"].map(TIPO_ICMS).to_numpy(dtype=float)[:, None]
+    is_azul = (tab["modalidade"] == "Azul").to_numpy()[:, None]
+    is_dg = (tab["tipo_oferta"] == "Desconto Garantido").to_numpy()[:, None]
+    desconto_garantido = tab["desconto_garantido"].fillna(0.0).to_numpy(dtype=float)[:, None]
+
+    mes_inicio = col("mes_inicio", np.int64)
+    ano_inicio = col("ano_inicio", np.int64)
+    n_meses = (col("ano_fim", np.int64) - ano_inicio) * 12 + (col("mes_fim", np.int64) - mes_inicio) + 1
+    n_meses = np.clip(n_meses, 0, MAX_MESES)
+
+    # --- _construir_serie_tarifas ---
+    largura = int(n_meses.max()) if n_unidades else 0
+    posicao = np.arange(largura)[None, :]
+    mascara = posicao < n_meses
+    deslocamento = posicao + (mes_inicio - 1)
+    meses = deslocamento % 12 + 1
+    year_idx = deslocamento // 12
+    anos = ano_inicio + year_idx
+    # Units of one Distribuidora/SubGrupo/Modalidade share their tariffs:
+    # project each distinct set once per contract year, then gather
+    tarifas_unicas, grupo = np.unique(
+        tab[COMPONENTES_TARIFA].to_numpy(dtype=float).reshape(n_unidades, len(COMPONENTES_TARIFA)),
+        axis=0, return_inverse=True,
+    )
+    fatores = (1 + REAJUSTE_ANUAL_PADRAO) ** np.arange(int(year_idx.max()) + 1 if largura else 0, dtype=float)
+    projetadas = tarifas_unicas[:, :, None] * fatores[None, None, :]
+    grupo = grupo.reshape(-1, 1)
+    t = {c: projetadas[grupo, j, year_idx] for j, c in enumerate(COMPONENTES_TARIFA)}
+
+    # --- _calcular_acr_mes ---
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fio = np.where(
+            is_azul,
+            (t["tusd_kw_p"] * dem_hp + t["tusd_kw_fp"] * dem_hfp) / consumo_total_mwh
+            + t["tusd_mwh_p"] * prop_hp
+            + t["tusd_mwh_fp"] * prop_hfp,
+            t["tusd_kw_fp"] * (dem_hp + dem_hfp) / consumo_total_mwh + t["tusd_mwh_fp"],
+        )
+        fio_pis = np.where(aliq_pis < 1, fio / (1 - aliq_pis) - fio, 0.0)
+        fio_icms = np.where(aliq_icms < 1, fio / (1 - aliq_icms) - fio, 0.0)
+
+        energia = t["te_fp"] * prop_hfp + t["te_p"] * prop_hp
+        energia_pis = np.where(aliq_pis < 1, energia / (1 - aliq_pis) - energia, 0.0)
+        energia_icms = np.where(aliq_icms < 1, energia / (1 - aliq_icms) - energia, 0.0)
+
+        custo_acr = fio + fio_pis + fio_icms + energia + energia_pis + energia_icms
+
+        # --- _calcular_acl_mes ---
+        fio_acl = np.where(
+            is_azul,
+            num_energia * (t["tusd_kw_p"] * dem_hp + t["tusd_kw_fp"] * dem_hfp)
+            / consumo_total_mwh
+            + t["tusd_mwh_p"],
+            num_energia * t["tusd_kw_fp"] * (dem_hp + dem_hfp) / consumo_total_mwh,
+        )
+        energia_cg = custo_acr - fio_acl
+
+        precos, n_precos = _matriz_precos(tab["precos_por_ano"])
+        preco_pd = np.take_along_axis(
+            precos, np.minimum(year_idx, np.maximum(n_precos - 1, 0)), axis=1
+        ) if precos.shape[1] else np.zeros_like(energia_cg)
+        energia_acl = np.where(
+            is_dg,
+            energia_cg * (1 - desconto_garantido / 100.0),
+            np.where(n_precos > 0, preco_pd, energia_cg),
+        )
+
+        # PD gross-up by ICMS type; DG prices already carry the taxes
+        bruto_icms = np.where(aliq_icms < 1, energia_acl / (1 - aliq_icms), energia_acl)
+        bruto_sp = np.where(aliq_pis < 1, bruto_icms / (1 - aliq_pis), bruto_icms)
+        bruto_snicms = np.where(aliq_pis < 1, energia_acl / (1 - aliq_pis), energia_acl)
+        energia_final = np.where(
+            is_dg | ((num_icms != 2) & (num_icms != 3)),
+            energia_acl,
+            np.where(num_icms == 2, bruto_sp, bruto_snicms),
+        )
+
+        custo_acl = fio_acl + energia_final + despesas_ccee
+
+        # --- _calcular_mensal ---
+        desconto = np.where(custo_acr != 0, 1 - custo_acl / custo_acr, 0.0)
+
+    def mascarar(x: np.ndarray) -> np.ndarray:
+        return np.where(mascara, x, 0.0)
+
+    acr = {
+        nome: mascarar(valor)
+        for nome, valor in zip(
+            COMPONENTES_ACR,
+            (fio, fio_pis, fio_icms, energia, energia_pis, energia_icms, custo_acr),
+        )
+    }
+    acl = {
+        nome: mascarar(valor)
+        for nome, valor in zip(
+            COMPONENTES_ACL, (fio_acl, energia_cg, energia_acl, energia_final, custo_acl)
+        )
+    }
+    custo_acr = acr["custo_total_acr"]
+    custo_acl = acl["custo_total_acl"]
+    economia = (custo_acr - custo_acl) * consumo_total_mwh
+    gasto_acr = custo_acr * consumo_total_mwh
+    gasto_acl = custo_acl * consumo_total_mwh
+
+    # --- _agregar_anual ---
+    n_anos = np.where(
+        n_meses > 0, (mes_inicio - 1 + n_meses - 1) // 12 + 1, 0
+    )
+    largura_anos = int(n_anos.max()) if n_unidades else 0
+    linha = np.repeat(np.arange(n_unidades), largura)
+    destino = (linha * largura_anos + year_idx.ravel()) if largura else linha
+    tamanho = n_unidades * largura_anos
+
+    def somar_anos(x: np.ndarray) -> np.ndarray:
+        if not largura:
+            return np.zeros((n_unidades, largura_anos))
+        return np.bincount(
+            destino[mascara.ravel()], weights=x.ravel()[mascara.ravel()], minlength=tamanho
+        ).reshape(n_unidades, largura_anos)
+
+    anual_acr = somar_anos(gasto_acr)
+    anual_acl = somar_anos(gasto_acl)
+    anual_economia = somar_anos(economia)
+    anual_meses = somar_anos(np.ones_like(gasto_acr)).astype(np.int64)
+    mascara_anos = np.arange(largura_anos)[None, :] < n_anos
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anual_desconto = np.where(anual_acr != 0, 1 - anual_acl / anual_acr, 0.0)
+
+    # NPV: npf.npv(r, v) == sum(v / (1 + r) ** arange(len(v)))
+    taxa_anual = (1 + taxa_mensal_vpl) ** 12 - 1
+    soma_economia = anual_economia.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        vpl = (anual_economia / (1 + taxa_anual) ** np.arange(largura_anos)[None, :]).sum(axis=1)
+    usar_vpl = (n_anos[:, 0] > 0) & (taxa_anual[:, 0] > 0) & np.isfinite(vpl)
+    economia_vpl = np.where(usar_vpl, vpl, soma_economia)
+
+    # --- _montar_resultado ---
+    gasto_acr_total = gasto_acr.sum(axis=1)
+    gasto_acl_total = gasto_acl.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        desconto_geral = np.where(
+            gasto_acr_total != 0, 1 - gasto_acl_total / gasto_acr_total, 0.0
+        )
+
+    periodos = [
+        [f"{MESES_PT[int(mi) - 1]}/{int(ai)}", f"{MESES_PT[int(mf) - 1]}/{int(af)}"]
+        for mi, ai, mf, af in zip(
+            *(tab[c].tolist() for c in ("mes_inicio", "ano_inicio", "mes_fim", "ano_fim"))
+        )
+    ]
+
+    return {
+        "parametros": tab,
+        "periodo": periodos,
+        "tarifas": tab[COMPONENTES_TARIFA].to_numpy(dtype=float),
+        "vigencia": [str(v) for v in tab["vigencia"].tolist()],
+        "n_meses": n_meses[:, 0],
+        "meses": meses,
+        "anos": anos,
+        "mascara": mascara,
+        "acr": acr,
+        "acl": acl,
+        "custo_acr_mwh": custo_acr,
+        "custo_acl_mwh": custo_acl,
+        "desconto": mascarar(desconto),
+        "economia": economia,
+        "gasto_acr": gasto_acr,
+        "gasto_acl": gasto_acl,
+        "anual": {
+            "ano": ano_inicio + np.arange(largura_anos)[None, :],
+            "gasto_acr": anual_acr,
+            "gasto_acl": anual_acl,
+            "economia": anual_economia,
+            "desconto": anual_desconto,
+            "meses": anual_meses,
+            "mascara": mascara_anos,
+        },
+        "desconto_geral": desconto_geral,
+        "economia_total": economia.sum(axis=1),
+        "economia_vpl": economia_vpl,
+    }
+
+
+def resultado_unidade(lote: dict, i: int) -> ResultadoSimulacao:
+    """Unit i of a calcular_lote result, shaped like LogicaCalculadora.calcular().
+
+    The result's arrays are views into the batch's rows (no copies).
+    """
+    n = int(lote["n_meses"][i])
+    anual = lote["anual"]
+    y = int(anual["mascara"][i].sum())
+
+    return ResultadoSimulacao(
+        meses=lote["meses"][i, :n],
+        anos=lote["anos"][i, :n],
+        mensal={c: lote[c][i, :n] for c in COLUNAS_MENSAIS},
+        acr={c: v[i, :n] for c, v in lote["acr"].items()},
+        acl={c: v[i, :n] for c, v in lote["acl"].items()},
+        anual={c: anual[c][i, :y] for c in COLUNAS_ANUAIS},
+        desconto_geral=float(lote["desconto_geral"][i]),
+        economia_total=float(lote["economia_total"][i]),
+        economia_vpl=float(lote["economia_vpl"][i]),
+        periodo=list(lote["periodo"][i]),
+        tarifas_utilizadas=TarifasVigentes(
+            **dict(zip(COMPONENTES_TARIFA, lote["tarifas"][i].tolist())), vigencia=lote["vigencia"][i]
+        ),
+    )
+
+
+def _matriz_precos(precos_por_ano: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Ragged PD price lists → (N, P) matrix padded with each unit's last
+    price, plus the (N, 1) list lengths."""
+    listas = [list(p) if isinstance(p, (list, tuple, np.ndarray)) else [] for p in precos_por_ano]
+    n_precos = np.array([len(p) for p in listas], dtype=np.int64)[:, None]
+    largura = int(n_precos.max()) if len(listas) else 0
+    matriz = np.zeros((len(listas), largura))
+    for i, p in enumerate(listas):
+        if p:
+            matriz[i, : len(p)] = p
+            matriz[i, len(p):] = p[-1]
+    return matriz, n_precos
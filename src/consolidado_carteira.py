@@ -0,0 +1,88 @@
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_CONSOLIDADO = ["gasto_acr", "gasto_acl", "economia"]
+
+
+def tabela_longa(unidades: Iterable[dict], inicio: int = 0) -> pd.DataFrame:
+    """Long-format (unit, year, month) table of the valid units' monthly
+    results: unidade (position in unidades, from inicio), distribuidora,
+    ano, mes and COLUNAS_CONSOLIDADO. Built by concatenating the results'
+    arrays, without per-month dicts."""
+    partes = [(i, r["Distribuidora"], r["_resultado"]) for i, r in enumerate(unidades, start=inicio) if "_resultado" in r]
+    tamanhos = [len(res.meses) for *_, res in partes]
+    return pd.DataFrame({
+        "unidade": np.repeat(np.array([i for i, *_ in partes], dtype=np.int64), tamanhos),
+        "distribuidora": np.repeat(np.array([d for _, d, _ in partes], dtype=object), tamanhos),
+        "ano": np.concatenate([res.anos for *_, res in partes] or [np.empty(0, dtype=np.int64)]),
+        "mes": np.concatenate([res.meses for *_, res in partes] or [np.empty(0, dtype=np.int64)]),
+        **{
+            c: np.concatenate([res.mensal[c] for *_, res in partes] or [np.empty(0)])
+            for c in COLUNAS_CONSOLIDADO
+        },
+    })
+
+
+class ConsolidadoCarteira:
+    """Portfolio totals of unit results, accumulated block by block.
+
+    adicionar() reduces each block of unit entries with one groupby over
+    its tabela_longa into (distribuidora, ano, mes) sums and adds them to
+    the running totals, so the units' monthly detail can be dropped right
+    after. resultado() rolls the totals up by month, year and distributor;
+    every desconto is weighted by the ACR spend (1 - gasto_acl / gasto_acr),
+    like the units' desconto_geral.
+    """
+
+    def __init__(self):
+        chaves = pd.MultiIndex.from_arrays(
+            [pd.Index([], dtype=object), pd.Index([], dtype=np.int64), pd.Index([], dtype=np.int64)],
+            names=["distribuidora", "ano", "mes"],
+        )
+        self._mensal = pd.DataFrame({c: pd.Series(dtype=float) for c in COLUNAS_CONSOLIDADO}, index=chaves)
+        self._unidades = pd.DataFrame(
+            {"unidades": pd.Series(dtype=np.int64), "economia_vpl": pd.Series(dtype=float)},
+            index=pd.Index([], dtype=object, name="distribuidora"),
+        )
+
+    def adicionar(self, unidades: Iterable[dict]) -> "ConsolidadoCarteira":
+        """Add a block of processar_multi_unitario unit entries (those
+        without _resultado are skipped)."""
+        unidades = [r for r in unidades if "_resultado" in r]
+        if not unidades:
+            return self
+        parcial = tabela_longa(unidades).groupby(["distribuidora", "ano", "mes"])[COLUNAS_CONSOLIDADO].sum()
+        self._mensal = self._mensal.add(parcial, fill_value=0)
+        por_unidade = pd.DataFrame({
+            "distribuidora": [r["Distribuidora"] for r in unidades],
+            "economia_vpl": [r["Economia VPL"] for r in unidades],
+        }).groupby("distribuidora").agg(unidades=("economia_vpl", "size"), economia_vpl=("economia_vpl", "sum"))
+        self._unidades = self._unidades.add(por_unidade, fill_value=0).astype({"unidades": np.int64})
+        return self
+
+    def resultado(self) -> dict:
+        """{'mensal': by (ano, mes), 'anual': by ano, 'distribuidoras': by
+        distribuidora (with unidades and economia_vpl)} DataFrames of
+        gasto_acr, gasto_acl, economia and desconto."""
+        return {
+            "mensal": _com_desconto(self._mensal.groupby(level=["ano", "mes"]).sum()),
+            "anual": _com_desconto(self._mensal.groupby(level="ano").sum()),
+            "distribuidoras": _com_desconto(
+                self._mensal.groupby(level="distribuidora").sum().join(self._unidades)
+            ),
+        }
+
+
+def _com_desconto(totais: pd.DataFrame) -> pd.DataFrame:
+    acr = totais["gasto_acr"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        desconto = np.where(acr != 0, 1 - totais["gasto_acl"].to_numpy() / acr, 0.0)
+    return totais.assign(desconto=desconto)
+
+
+def consolidar_resultados(unidades: Iterable[dict]) -> dict:
+    """Portfolio totals of processar_multi_unitario unit entries by month,
+    year and distributor (see ConsolidadoCarteira.resultado)."""
+    return ConsolidadoCarteira().adicionar(unidades).resultado()
@@ -17,3 +17,4 @@ MESES_PT = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun',
 SUBGRUPOS_GRUPO_A = ['A1', 'A2', 'A3', 'A3a', 'A4', 'AS']
 MODALIDADES_RELEVANTES = ['Azul', 'Verde']
 REAJUSTE_ANUAL_PADRAO = 0.05  # 5% fallback for tariff projection
+DESVIO_REAJUSTE_PADRAO = 0.03  # 3 p.p. spread of the annual readjustment (Monte Carlo)
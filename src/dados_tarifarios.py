@@ -1,17 +1,149 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
 import pandas as pd
 import streamlit as st
-from src.formatacao import parse_valor_br
+from src.formatacao import parse_valor_br_series
 from src.models import TarifasVigentes
 from src.constantes import SUBGRUPOS_GRUPO_A, MODALIDADES_RELEVANTES
 
+logger = logging.getLogger(__name__)
+
 CSV_PATH = "tarifas-homologadas-distribuidoras-energia-eletrica.csv"
+SNAPSHOT_DIR = "data"
+# Bump when the filter/typing rules change so old snapshots are discarded
+_SNAPSHOT_VERSAO = 2
+
+# Columns used by the filters and the tariff lookups; the rest are never read
+COLUNAS_ANEEL = [
+    "SigAgente",
+    "DatInicioVigencia",
+    "DscBaseTarifaria",
+    "DscSubGrupo",
+    "DscModalidadeTarifaria",
+    "DscClasse",
+    "DscDetalhe",
+    "NomPostoTarifario",
+    "DscUnidadeTerciaria",
+    "VlrTUSD",
+    "VlrTE",
+]
+CHUNK_LINHAS = 50_000
+CSV_ENGINE = "c"  # "c" (pandas) or "pyarrow"
 
 
 @st.cache_data
-def carregar_csv_aneel(caminho: str = CSV_PATH) -> pd.DataFrame:
+def carregar_csv_aneel(
+    caminho: str = CSV_PATH, usar_snapshot: bool = True, engine: str = CSV_ENGINE
+) -> pd.DataFrame:
+    """Filtered ANEEL tariff table, served from the Parquet snapshot when fresh.
+
+    The snapshot lives in SNAPSHOT_DIR and is keyed by the CSV's size, mtime
+    and SHA-256. It is rebuilt only when the CSV content changes; a touched
+    but identical CSV just refreshes the stored size/mtime. On a miss the
+    CSV is streamed in chunks (see _ler_csv_aneel) with the given engine.
+    """
+    if usar_snapshot:
+        df = _ler_snapshot(caminho)
+        if df is not None:
+            return df
+
+    df = _ler_csv_aneel(caminho, engine=engine)
+
+    if usar_snapshot:
+        _gravar_snapshot(caminho, df)
+    return df
+
+
+def _caminhos_snapshot(caminho: str) -> tuple[str, str]:
+    """(parquet, metadata json) paths for the snapshot of a given CSV."""
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    base = os.path.join(SNAPSHOT_DIR, nome)
+    return base + ".parquet", base + ".json"
+
+
+def _hash_arquivo(caminho: str) -> str:
+    """SHA-256 of the file contents, read in 1 MiB blocks."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _ler_snapshot(caminho: str) -> pd.DataFrame | None:
+    """Snapshot DataFrame if it matches the CSV on disk, else None."""
+    arq_parquet, arq_meta = _caminhos_snapshot(caminho)
+    try:
+        with open(arq_meta, encoding="utf-8") as f:
+            meta = json.load(f)
+        st_csv = os.stat(caminho)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("versao") != _SNAPSHOT_VERSAO or not os.path.exists(arq_parquet):
+        return None
+
+    if meta.get("tamanho") != st_csv.st_size or meta.get("mtime_ns") != st_csv.st_mtime_ns:
+        # Size/mtime changed: only the content hash decides
+        if meta.get("tamanho") != st_csv.st_size or meta.get("sha256") != _hash_arquivo(caminho):
+            return None
+        meta["mtime_ns"] = st_csv.st_mtime_ns
+        _gravar_json(arq_meta, meta)
+
+    try:
+        return pd.read_parquet(arq_parquet)
+    except Exception:
+        return None
+
+
+def _gravar_snapshot(caminho: str, df: pd.DataFrame) -> None:
+    """Persist df as the snapshot of caminho. Failures are logged, not raised."""
+    arq_parquet, arq_meta = _caminhos_snapshot(caminho)
+    tmp = arq_parquet + ".tmp"
+    try:
+        st_csv = os.stat(caminho)
+        meta = {
+            "versao": _SNAPSHOT_VERSAO,
+            "tamanho": st_csv.st_size,
+            "mtime_ns": st_csv.st_mtime_ns,
+            "sha256": _hash_arquivo(caminho),
+        }
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, arq_parquet)
+        _gravar_json(arq_meta, meta)
+    except (OSError, ImportError) as e:
+        # Read-only filesystem or missing parquet engine: keep serving from CSV
+        logger.warning("Snapshot das tarifas não gravado (%s); usando o CSV.", e)
+        for parcial in (tmp, arq_meta + ".tmp"):
+            try:
+                os.remove(parcial)
+            except OSError:
+                pass
+
+
+def _gravar_json(caminho: str, dados: dict) -> None:
+    tmp = caminho + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f)
+    os.replace(tmp, caminho)
+
+
+def _ler_csv_aneel(
+    caminho: str, chunksize: int | None = CHUNK_LINHAS, engine: str = CSV_ENGINE
+) -> pd.DataFrame:
     """Load and pre-filter the ANEEL CSV (~309K rows → ~28-31K after filtering).
 
-    Read:  encoding='latin-1', sep=';'
+    Read:  encoding='latin-1', sep=';', only COLUNAS_ANEEL, as strings
+    Stream: chunks of `chunksize` rows are filtered and typed as they
+        arrive, so peak memory tracks the filtered output rather than the
+        full file. chunksize=None reads the file in one go.
+        engine='pyarrow' streams record batches from pyarrow's
+        multi-threaded CSV reader instead of pandas' C parser.
     Filter:
         DscBaseTarifaria  contains 'Aplica'
         DscSubGrupo       in SUBGRUPOS_GRUPO_A
@@ -19,11 +151,46 @@ def carregar_csv_aneel(caminho: str = CSV_PATH) -> pd.DataFrame:
         DscClasse         contains 'aplica' (case-insensitive)
         DscDetalhe        contains 'aplica' (case-insensitive)
     Convert:
-        VlrTUSD, VlrTE   → float via parse_valor_br
+        VlrTUSD, VlrTE   → float via parse_valor_br_series
         DatInicioVigencia → pd.to_datetime
     """
-    df = pd.read_csv(caminho, sep=";", encoding="latin-1")
+    if engine == "pyarrow":
+        blocos = _blocos_arrow(caminho)
+    else:
+        leitor = pd.read_csv(
+            caminho, sep=";", encoding="latin-1",
+            usecols=COLUNAS_ANEEL, dtype=str, chunksize=chunksize,
+        )
+        blocos = [leitor] if chunksize is None else leitor
+
+    partes = [_tipar_aneel(_filtrar_aneel(bloco)) for bloco in blocos]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_ANEEL)
+
+    df = pd.concat(partes, ignore_index=True)
+    return df[COLUNAS_ANEEL]
+
+
+def _blocos_arrow(caminho: str):
+    """Yield the CSV as pandas chunks from pyarrow's streaming CSV reader."""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    leitor = pa_csv.open_csv(
+        caminho,
+        read_options=pa_csv.ReadOptions(encoding="latin-1", use_threads=True),
+        parse_options=pa_csv.ParseOptions(delimiter=";"),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=COLUNAS_ANEEL,
+            column_types={col: pa.string() for col in COLUNAS_ANEEL},
+        ),
+    )
+    for lote in leitor:
+        yield lote.to_pandas()
 
+
+def _filtrar_aneel(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep Group A, Azul/Verde, 'Tarifa de Aplicação' rows."""
     mask = (
         df["DscBaseTarifaria"].str.contains("Aplica", na=False)
         & df["DscSubGrupo"].isin(SUBGRUPOS_GRUPO_A)
@@ -31,57 +198,331 @@ def carregar_csv_aneel(caminho: str = CSV_PATH) -> pd.DataFrame:
         & df["DscClasse"].str.contains("aplica", case=False, na=False)
         & df["DscDetalhe"].str.contains("aplica", case=False, na=False)
     )
-    df = df[mask].copy()
+    return df[mask].copy()
+
 
-    df["VlrTUSD"] = df["VlrTUSD"].apply(parse_valor_br)
-    df["VlrTE"] = df["VlrTE"].apply(parse_valor_br)
+def _tipar_aneel(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert tariff values and vigência dates of a filtered chunk."""
+    df["VlrTUSD"] = parse_valor_br_series(df["VlrTUSD"])
+    df["VlrTE"] = parse_valor_br_series(df["VlrTE"])
     df["DatInicioVigencia"] = pd.to_datetime(df["DatInicioVigencia"], format="mixed")
+    return df
+
+
+CHAVE_TARIFA = ["SigAgente", "DscSubGrupo", "DscModalidadeTarifaria"]
+COMPONENTES_TARIFA = ["tusd_kw_fp", "tusd_kw_p", "tusd_mwh_fp", "tusd_mwh_p", "te_fp", "te_p"]
+_COMPONENTE = ["NomPostoTarifario", "DscUnidadeTerciaria"]
+
+
+def tabela_historico_tarifas(df: pd.DataFrame) -> pd.DataFrame:
+    """Every tariff snapshot of every key, built in a single pivot.
+
+    Index: (SigAgente, DscSubGrupo, DscModalidadeTarifaria,
+    DatInicioVigencia), sorted, so `.loc[key]` slices one key's history
+    in vigência order. Columns: COMPONENTES_TARIFA, following the same
+    posto/unit rules as _tarifas_de_componentes.
+    """
+    nivel = CHAVE_TARIFA + ["DatInicioVigencia"]
+    # First row per posto/unit, as the scalar lookups pick with iloc[0]
+    primeiras = df.drop_duplicates(nivel + _COMPONENTE)
+    pivo = (
+        primeiras.set_index(nivel + _COMPONENTE)[["VlrTUSD", "VlrTE"]]
+        .unstack(_COMPONENTE)
+        .sort_index()
+    )
+
+    def coluna(valor: str, posto: str, unidade: str) -> pd.Series:
+        if (valor, posto, unidade) not in pivo.columns:
+            return pd.Series(0.0, index=pivo.index)
+        return pivo[(valor, posto, unidade)].fillna(0.0)
+
+    is_verde = pivo.index.get_level_values("DscModalidadeTarifaria") == "Verde"
+    te_fp_seca = coluna("VlrTE", "Fora ponta seca", "MWh")
+    te_p_seca = coluna("VlrTE", "Ponta seca", "MWh")
+
+    tabela = pd.DataFrame({
+        "tusd_kw_fp": coluna("VlrTUSD", "Não se aplica", "kW").where(
+            is_verde, coluna("VlrTUSD", "Fora ponta", "kW")
+        ),
+        "tusd_kw_p": coluna("VlrTUSD", "Ponta", "kW").where(~is_verde, 0.0),
+        "tusd_mwh_fp": coluna("VlrTUSD", "Fora ponta", "MWh"),
+        "tusd_mwh_p": coluna("VlrTUSD", "Ponta", "MWh"),
+        "te_fp": te_fp_seca.where(te_fp_seca != 0.0, coluna("VlrTE", "Fora ponta", "MWh")),
+        "te_p": te_p_seca.where(te_p_seca != 0.0, coluna("VlrTE", "Ponta", "MWh")),
+    }, index=pivo.index)
+    tabela.columns.name = None
+    return tabela.astype(float)
+
+
+def _em_dias(datas: pd.DatetimeIndex) -> np.ndarray:
+    """Dates as int64 day numbers since the epoch (time of day dropped)."""
+    return datas.to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+
+def _historico_vazio() -> pd.DataFrame:
+    return pd.DataFrame(
+        columns=COMPONENTES_TARIFA,
+        index=pd.DatetimeIndex([], name="DatInicioVigencia"),
+        dtype=float,
+    )
+
 
-    return df.reset_index(drop=True)
+class IndiceTarifas:
+    """Constant-time tariff lookups over a loaded ANEEL frame.
 
+    Built from tabela_historico_tarifas in one pivot: each (SigAgente,
+    DscSubGrupo, DscModalidadeTarifaria) key maps to its current
+    TarifasVigentes, and the cascading select lists are precomputed.
+    `versao` fingerprints the table content.
 
-def listar_distribuidoras(df: pd.DataFrame) -> list[str]:
+    No method modifies the index after __init__ and lookups hand out
+    copies (the lookup arrays are flagged read-only), so one instance can
+    be shared by every session (see carregar_indice_tarifas). Callers must
+    not modify `df` or `historico` in place.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.historico = tabela_historico_tarifas(df)
+
+        # As-of lookups: the table is sorted by (key, vigência), so each key
+        # owns a contiguous slice of day numbers that can be bisected
+        self._valores = self.historico.to_numpy()
+        self._datas = self.historico.index.get_level_values("DatInicioVigencia")
+        self._dias = _em_dias(self._datas)
+        self._valores.flags.writeable = False
+        self._dias.flags.writeable = False
+        self._faixas = {}
+        for codigo, (chave, posicoes) in enumerate(
+            self.historico.groupby(level=CHAVE_TARIFA, sort=False).indices.items()
+        ):
+            self._faixas[chave] = (codigo, posicoes[0], posicoes[-1] + 1)
+
+        atuais = self.historico.groupby(level=CHAVE_TARIFA, sort=False).tail(1)
+        self._vigentes = {
+            (dist, sg, mod): TarifasVigentes(
+                **dict(zip(COMPONENTES_TARIFA, valores)),
+                vigencia=data.strftime("%d/%m/%Y"),
+            )
+            for (dist, sg, mod, data), valores in zip(
+                atuais.index, atuais.to_numpy().tolist()
+            )
+        }
+
+        self._subgrupos = {}
+        self._modalidades = {}
+        for dist, sg, mod in sorted(self._vigentes):
+            subgrupos = self._subgrupos.setdefault(dist, [])
+            if sg not in subgrupos:
+                subgrupos.append(sg)
+            self._modalidades.setdefault((dist, sg), []).append(mod)
+        self.distribuidoras = sorted(self._subgrupos)
+
+        self._mes_reajuste = {
+            dist: data.month
+            for dist, data in df.groupby("SigAgente")["DatInicioVigencia"].max().items()
+        }
+
+        # Content fingerprint of the tariff table (keys, vigências, values);
+        # cached simulation results are tagged with it (see cache_simulacao)
+        impressao = hashlib.sha256(repr(list(self._faixas)).encode())
+        impressao.update(np.ascontiguousarray(self._dias).tobytes())
+        impressao.update(np.ascontiguousarray(self._valores, dtype=float).tobytes())
+        self.versao = impressao.hexdigest()[:16]
+
+    def tarifas_vigentes(self, distribuidora: str, subgrupo: str, modalidade: str) -> TarifasVigentes:
+        tarifas = self._vigentes.get((distribuidora, subgrupo, modalidade))
+        return tarifas.model_copy() if tarifas is not None else TarifasVigentes()
+
+    def compactar(self) -> "TarifasCompactas":
+        """Current tariffs only, as a small picklable table (for worker processes)."""
+        return TarifasCompactas(
+            {
+                chave: (*(getattr(t, c) for c in COMPONENTES_TARIFA), t.vigencia)
+                for chave, t in self._vigentes.items()
+            },
+            self.versao,
+        )
+
+    def tarifas_na_data(
+        self, distribuidora: str, subgrupo: str, modalidade: str, data
+    ) -> TarifasVigentes:
+        """TarifasVigentes in force on `data` (latest vigência <= data).
+
+        Empty TarifasVigentes for unknown keys or dates before the first
+        vigência, like tarifas_vigentes.
+        """
+        faixa = self._faixas.get((distribuidora, subgrupo, modalidade))
+        if faixa is None:
+            return TarifasVigentes()
+        _, inicio, fim = faixa
+        dia = _em_dias(pd.DatetimeIndex([pd.Timestamp(data)]))[0]
+        pos = inicio + int(np.searchsorted(self._dias[inicio:fim], dia, side="right")) - 1
+        if pos < inicio:
+            return TarifasVigentes()
+        return TarifasVigentes(
+            **dict(zip(COMPONENTES_TARIFA, self._valores[pos].tolist())),
+            vigencia=self._datas[pos].strftime("%d/%m/%Y"),
+        )
+
+    def tarifas_na_data_lote(self, chaves: list[tuple], datas) -> pd.DataFrame:
+        """Vectorized tarifas_na_data for n (key, date) pairs.
+
+        Returns one row per pair, in input order: COMPONENTES_TARIFA plus
+        DatInicioVigencia of the vigência used. Pairs with no tariff in
+        force get zeros and NaT, mirroring the empty TarifasVigentes.
+        """
+        n = len(chaves)
+        codigos = np.full(n, -1, dtype=np.int64)
+        inicios = np.zeros(n, dtype=np.int64)
+        for i, chave in enumerate(chaves):
+            faixa = self._faixas.get(tuple(chave))
+            if faixa is not None:
+                codigos[i], inicios[i], _ = faixa
+
+        # Encode (key, day) as one sortable integer; clipping keeps each
+        # query inside its own key's band of width `largura`
+        base = int(self._dias.min()) if len(self._dias) else 0
+        largura = (int(self._dias.max()) - base + 2) if len(self._dias) else 2
+        codigos_tabela = np.repeat(
+            np.arange(len(self._faixas), dtype=np.int64),
+            [fim - inicio for _, inicio, fim in self._faixas.values()],
+        )
+        combinado = codigos_tabela * largura + (self._dias - base)
+
+        dias = _em_dias(pd.DatetimeIndex(pd.to_datetime(datas)))
+        deslocamento = np.clip(dias - base, -1, largura - 1)
+        pos = np.searchsorted(combinado, codigos * largura + deslocamento, side="right") - 1
+        validos = (codigos >= 0) & (pos >= inicios)
+        pos = np.where(validos, pos, 0)
+
+        resultado = pd.DataFrame(
+            np.where(validos[:, None], self._valores[pos], 0.0) if len(self._valores)
+            else np.zeros((n, len(COMPONENTES_TARIFA))),
+            columns=COMPONENTES_TARIFA,
+        )
+        resultado["DatInicioVigencia"] = (
+            self._datas[pos].where(validos) if len(self._datas) else pd.NaT
+        )
+        return resultado
+
+    def historico_tarifas(self, distribuidora: str, subgrupo: str, modalidade: str) -> pd.DataFrame:
+        try:
+            return self.historico.loc[(distribuidora, subgrupo, modalidade)]
+        except KeyError:
+            return _historico_vazio()
+
+    def listar_subgrupos(self, distribuidora: str) -> list[str]:
+        return list(self._subgrupos.get(distribuidora, []))
+
+    def listar_modalidades(self, distribuidora: str, subgrupo: str) -> list[str]:
+        return list(self._modalidades.get((distribuidora, subgrupo), []))
+
+    def mes_reajuste(self, distribuidora: str) -> int:
+        return self._mes_reajuste.get(distribuidora, 1)
+
+
+class TarifasCompactas:
+    """Read-only {(SigAgente, DscSubGrupo, DscModalidadeTarifaria): values}
+    table of current tariffs, built by IndiceTarifas.compactar().
+
+    Plain tuples, no frame or history: cheap to send once to each worker
+    of a process pool. Supports obter_tarifas_vigentes and `versao`.
+    """
+
+    def __init__(self, vigentes: dict, versao: str = ""):
+        self._vigentes = vigentes
+        self.versao = versao
+
+    def tarifas_vigentes(self, distribuidora: str, subgrupo: str, modalidade: str) -> TarifasVigentes:
+        valores = self._vigentes.get((distribuidora, subgrupo, modalidade))
+        if valores is None:
+            return TarifasVigentes()
+        return TarifasVigentes(**dict(zip(COMPONENTES_TARIFA, valores)), vigencia=valores[-1])
+
+
+@st.cache_resource
+def carregar_indice_tarifas(caminho: str = CSV_PATH) -> IndiceTarifas:
+    """Process-wide IndiceTarifas over carregar_csv_aneel(caminho)."""
+    return IndiceTarifas(carregar_csv_aneel(caminho))
+
+
+def listar_distribuidoras(df: pd.DataFrame | IndiceTarifas) -> list[str]:
     """Sorted unique distributor names."""
+    if isinstance(df, IndiceTarifas):
+        return list(df.distribuidoras)
     return sorted(df["SigAgente"].unique().tolist())
 
 
-def listar_subgrupos(df: pd.DataFrame, distribuidora: str) -> list[str]:
+def listar_subgrupos(df: pd.DataFrame | IndiceTarifas, distribuidora: str) -> list[str]:
     """Subgroups available for given distributor."""
+    if isinstance(df, IndiceTarifas):
+        return df.listar_subgrupos(distribuidora)
     subset = df[df["SigAgente"] == distribuidora]
     return sorted(subset["DscSubGrupo"].unique().tolist())
 
 
 def listar_modalidades(
-    df: pd.DataFrame, distribuidora: str, subgrupo: str
+    df: pd.DataFrame | IndiceTarifas, distribuidora: str, subgrupo: str
 ) -> list[str]:
     """Modalities available for given distributor + subgroup."""
+    if isinstance(df, IndiceTarifas):
+        return df.listar_modalidades(distribuidora, subgrupo)
     subset = df[(df["SigAgente"] == distribuidora) & (df["DscSubGrupo"] == subgrupo)]
     return sorted(subset["DscModalidadeTarifaria"].unique().tolist())
 
 
-def _extrair_valor(rows: pd.DataFrame, posto: str, unidade: str, coluna: str) -> float:
-    """Extract a single tariff value matching posto and unit."""
-    match = rows[
-        (rows["NomPostoTarifario"] == posto)
-        & (rows["DscUnidadeTerciaria"] == unidade)
-    ]
-    if match.empty:
-        return 0.0
-    return float(match[coluna].iloc[0])
+def _tarifas_de_componentes(
+    valores: dict, is_verde: bool, data: pd.Timestamp
+) -> TarifasVigentes:
+    """Assemble TarifasVigentes from {(posto, unidade): (VlrTUSD, VlrTE)}.
+
+    Azul: separate Ponta and Fora ponta demand (kW).
+    Verde: demand uses 'Não se aplica' (kW), tusd_kw_p = 0.
+    TE: prefers 'seca' variants, falls back to plain posto.
+    """
+    def tusd(posto, unidade):
+        return valores.get((posto, unidade), (0.0, 0.0))[0]
+
+    def te(posto):
+        return valores.get((posto, "MWh"), (0.0, 0.0))[1]
+
+    if is_verde:
+        tusd_kw_fp = tusd("Não se aplica", "kW")
+        tusd_kw_p = 0.0
+    else:
+        tusd_kw_fp = tusd("Fora ponta", "kW")
+        tusd_kw_p = tusd("Ponta", "kW")
+
+    return TarifasVigentes(
+        tusd_kw_fp=tusd_kw_fp,
+        tusd_kw_p=tusd_kw_p,
+        tusd_mwh_fp=tusd("Fora ponta", "MWh"),
+        tusd_mwh_p=tusd("Ponta", "MWh"),
+        te_fp=te("Fora ponta seca") or te("Fora ponta"),
+        te_p=te("Ponta seca") or te("Ponta"),
+        vigencia=data.strftime("%d/%m/%Y"),
+    )
 
 
 def obter_tarifas_vigentes(
-    df: pd.DataFrame, distribuidora: str, subgrupo: str, modalidade: str
+    df: pd.DataFrame | IndiceTarifas | TarifasCompactas,
+    distribuidora: str,
+    subgrupo: str,
+    modalidade: str,
 ) -> TarifasVigentes:
     """Extract most recent tariff values.
 
+    With an IndiceTarifas / TarifasCompactas this is a dictionary lookup.
+    With a DataFrame:
     1. Filter by distribuidora + subgrupo + modalidade
     2. Find max DatInicioVigencia
-    3. From that vigência, extract tariff components by posto/unit.
-       Azul: separate Ponta and Fora ponta demand (kW).
-       Verde: demand uses 'Não se aplica' (kW), tusd_kw_p = 0.
-       TE: prefers 'seca' variants, falls back to plain posto.
+    3. From that vigência, extract tariff components by posto/unit
+       (see _tarifas_de_componentes).
     """
+    if isinstance(df, (IndiceTarifas, TarifasCompactas)):
+        return df.tarifas_vigentes(distribuidora, subgrupo, modalidade)
+
     subset = df[
         (df["SigAgente"] == distribuidora)
         & (df["DscSubGrupo"] == subgrupo)
@@ -92,99 +533,56 @@ def obter_tarifas_vigentes(
         return TarifasVigentes()
 
     latest_date = subset["DatInicioVigencia"].max()
-    rows = subset[subset["DatInicioVigencia"] == latest_date]
-
-    is_verde = modalidade == "Verde"
-
-    # TUSD kW
-    if is_verde:
-        tusd_kw_fp = _extrair_valor(rows, "Não se aplica", "kW", "VlrTUSD")
-        tusd_kw_p = 0.0
-    else:
-        tusd_kw_fp = _extrair_valor(rows, "Fora ponta", "kW", "VlrTUSD")
-        tusd_kw_p = _extrair_valor(rows, "Ponta", "kW", "VlrTUSD")
-
-    # TUSD MWh
-    tusd_mwh_fp = _extrair_valor(rows, "Fora ponta", "MWh", "VlrTUSD")
-    tusd_mwh_p = _extrair_valor(rows, "Ponta", "MWh", "VlrTUSD")
-
-    # TE MWh — prefer 'seca' variants, fallback to plain
-    te_fp = _extrair_valor(rows, "Fora ponta seca", "MWh", "VlrTE")
-    if te_fp == 0.0:
-        te_fp = _extrair_valor(rows, "Fora ponta", "MWh", "VlrTE")
-
-    te_p = _extrair_valor(rows, "Ponta seca", "MWh", "VlrTE")
-    if te_p == 0.0:
-        te_p = _extrair_valor(rows, "Ponta", "MWh", "VlrTE")
+    rows = subset[subset["DatInicioVigencia"] == latest_date].drop_duplicates(_COMPONENTE)
 
-    vigencia_str = latest_date.strftime("%d/%m/%Y")
-
-    return TarifasVigentes(
-        tusd_kw_fp=tusd_kw_fp,
-        tusd_kw_p=tusd_kw_p,
-        tusd_mwh_fp=tusd_mwh_fp,
-        tusd_mwh_p=tusd_mwh_p,
-        te_fp=te_fp,
-        te_p=te_p,
-        vigencia=vigencia_str,
-    )
+    valores = {
+        (posto, unidade): (float(tusd), float(te))
+        for posto, unidade, tusd, te in rows[_COMPONENTE + ["VlrTUSD", "VlrTE"]].itertuples(
+            index=False, name=None
+        )
+    }
+    return _tarifas_de_componentes(valores, modalidade == "Verde", latest_date)
 
 
 def obter_historico_tarifas(
-    df: pd.DataFrame, distribuidora: str, subgrupo: str, modalidade: str
-) -> list[dict]:
-    """Tariff snapshots ordered by vigência ascending.
-    Each: {vigencia, tusd_kw_fp, tusd_kw_p, tusd_mwh_fp, tusd_mwh_p, te_fp, te_p}
+    df: pd.DataFrame | IndiceTarifas, distribuidora: str, subgrupo: str, modalidade: str
+) -> pd.DataFrame:
+    """Tariff snapshots of one key, indexed by DatInicioVigencia ascending.
+
+    Columns: COMPONENTES_TARIFA. With an IndiceTarifas this slices the
+    precomputed table; for whole-dataset work use tabela_historico_tarifas.
     """
+    if isinstance(df, IndiceTarifas):
+        return df.historico_tarifas(distribuidora, subgrupo, modalidade)
+
     subset = df[
         (df["SigAgente"] == distribuidora)
         & (df["DscSubGrupo"] == subgrupo)
         & (df["DscModalidadeTarifaria"] == modalidade)
     ]
-
     if subset.empty:
-        return []
+        return _historico_vazio()
+    return tabela_historico_tarifas(subset).droplevel(CHAVE_TARIFA)
 
-    is_verde = modalidade == "Verde"
-    vigencias = sorted(subset["DatInicioVigencia"].unique())
-    historico = []
 
-    for vig in vigencias:
-        rows = subset[subset["DatInicioVigencia"] == vig]
-
-        if is_verde:
-            tusd_kw_fp = _extrair_valor(rows, "Não se aplica", "kW", "VlrTUSD")
-            tusd_kw_p = 0.0
-        else:
-            tusd_kw_fp = _extrair_valor(rows, "Fora ponta", "kW", "VlrTUSD")
-            tusd_kw_p = _extrair_valor(rows, "Ponta", "kW", "VlrTUSD")
-
-        tusd_mwh_fp = _extrair_valor(rows, "Fora ponta", "MWh", "VlrTUSD")
-        tusd_mwh_p = _extrair_valor(rows, "Ponta", "MWh", "VlrTUSD")
-
-        te_fp = _extrair_valor(rows, "Fora ponta seca", "MWh", "VlrTE")
-        if te_fp == 0.0:
-            te_fp = _extrair_valor(rows, "Fora ponta", "MWh", "VlrTE")
-
-        te_p = _extrair_valor(rows, "Ponta seca", "MWh", "VlrTE")
-        if te_p == 0.0:
-            te_p = _extrair_valor(rows, "Ponta", "MWh", "VlrTE")
-
-        historico.append({
-            "vigencia": pd.Timestamp(vig).strftime("%d/%m/%Y"),
-            "tusd_kw_fp": tusd_kw_fp,
-            "tusd_kw_p": tusd_kw_p,
-            "tusd_mwh_fp": tusd_mwh_fp,
-            "tusd_mwh_p": tusd_mwh_p,
-            "te_fp": te_fp,
-            "te_p": te_p,
-        })
-
-    return historico
+def obter_tarifas_na_data(
+    df: pd.DataFrame | IndiceTarifas, distribuidora: str, subgrupo: str, modalidade: str, data
+) -> TarifasVigentes:
+    """Tariff values in force on a given date (as-of the latest vigência <= data)."""
+    indice = df if isinstance(df, IndiceTarifas) else IndiceTarifas(
+        df[
+            (df["SigAgente"] == distribuidora)
+            & (df["DscSubGrupo"] == subgrupo)
+            & (df["DscModalidadeTarifaria"] == modalidade)
+        ]
+    )
+    return indice.tarifas_na_data(distribuidora, subgrupo, modalidade, data)
 
 
-def obter_mes_reajuste(df: pd.DataFrame, distribuidora: str) -> int:
+def obter_mes_reajuste(df: pd.DataFrame | IndiceTarifas, distribuidora: str) -> int:
     """Typical adjustment month derived from most recent DatInicioVigencia."""
+    if isinstance(df, IndiceTarifas):
+        return df.mes_reajuste(distribuidora)
     subset = df[df["SigAgente"] == distribuidora]
     if subset.empty:
         return 1
@@ -0,0 +1,134 @@
+import atexit
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from src.cache_lru import CacheLRU
+
+logger = logging.getLogger(__name__)
+
+CACHE_PNG_MAX_ITENS = 512
+LARGURA_PNG = 800
+ALTURA_PNG = 400
+
+
+def chave_grafico(fig: go.Figure, largura: int = LARGURA_PNG, altura: int = ALTURA_PNG) -> str:
+    """Stable key: SHA-256 of the figure JSON (data + layout) and the image size."""
+    return hashlib.sha256(f"{largura}x{altura}\n{fig.to_json()}".encode()).hexdigest()
+
+
+# One renderer per process (the Streamlit server or a worker)
+_renderizador_lock = threading.Lock()
+_renderizador_ativo: bool | None = None
+_falha_render_registrada = False
+
+
+@st.cache_resource
+def obter_cache_png(max_itens: int = CACHE_PNG_MAX_ITENS) -> CacheLRU:
+    """Process-wide LRU of rendered PNG bytes, keyed by chave_grafico
+    (shared by all sessions)."""
+    return CacheLRU(max_itens)
+
+
+def iniciar_renderizador() -> bool:
+    """Start kaleido's persistent browser once per process, so renders skip
+    the per-call browser start-up. Returns False when unavailable (no
+    kaleido >= 1 / Chrome); plain pio.to_image is used then."""
+    global _renderizador_ativo
+    with _renderizador_lock:
+        if _renderizador_ativo is None:
+            try:
+                import kaleido
+
+                kaleido.start_sync_server(silence_warnings=True)
+                atexit.register(kaleido.stop_sync_server, silence_warnings=True)
+                _renderizador_ativo = True
+            except Exception as e:
+                # Logged once: the flag keeps later calls from retrying
+                logger.warning(
+                    "Renderizador persistente do kaleido indisponível (%s); "
+                    "cada exportação iniciará o próprio navegador.", e,
+                )
+                _renderizador_ativo = False
+        return _renderizador_ativo
+
+
+def _renderizar(figs: list[go.Figure], largura: int, altura: int) -> list[bytes]:
+    """PNGs of figs: one kaleido batch (pio.write_images) when there are
+    several, else pio.to_image."""
+    iniciar_renderizador()
+    if len(figs) > 1:
+        with tempfile.TemporaryDirectory() as pasta:
+            caminhos = [os.path.join(pasta, f"{i}.png") for i in range(len(figs))]
+            pio.write_images(figs, caminhos, format="png", width=largura, height=altura)
+            pngs = []
+            for caminho in caminhos:
+                with open(caminho, "rb") as f:
+                    pngs.append(f.read())
+            return pngs
+    return [pio.to_image(fig, format="png", width=largura, height=altura) for fig in figs]
+
+
+def _registrar_falha_render() -> None:
+    """Log the first render failure with its traceback; later ones (a batch
+    of thousands of reports) would only repeat it."""
+    global _falha_render_registrada
+    if not _falha_render_registrada:
+        _falha_render_registrada = True
+        logger.warning("Falha ao renderizar gráficos em PNG; os relatórios seguem sem imagem.", exc_info=True)
+
+
+def exportar_pngs(
+    figs: list[go.Figure],
+    largura: int = LARGURA_PNG,
+    altura: int = ALTURA_PNG,
+    cache: CacheLRU | None = None,
+) -> list[bytes]:
+    """PNG bytes of each figure, in order.
+
+    Cached figures (same data, layout and size) are not rendered again;
+    the rest are rendered in one batch by the warm renderer, identical
+    figures once. If rendering fails, those figures get b"" (the PDF
+    shows "Gráfico não disponível") and nothing is cached.
+    """
+    cache = cache if cache is not None else obter_cache_png()
+    chaves = [chave_grafico(fig, largura, altura) for fig in figs]
+    pngs = {}
+    faltantes = {}
+    for chave, fig in zip(chaves, figs):
+        if chave in pngs or chave in faltantes:
+            continue
+        png = cache.buscar(chave)
+        if png is None:
+            faltantes[chave] = fig
+        else:
+            pngs[chave] = png
+
+    if faltantes:
+        try:
+            renderizados = _renderizar(list(faltantes.values()), largura, altura)
+        except Exception:
+            _registrar_falha_render()
+            renderizados = None
+        for chave, png in zip(faltantes, renderizados or [b""] * len(faltantes)):
+            pngs[chave] = png
+            if png:
+                cache.guardar(chave, png)
+
+    return [pngs[chave] for chave in chaves]
+
+
+def exportar_png(
+    fig: go.Figure,
+    largura: int = LARGURA_PNG,
+    altura: int = ALTURA_PNG,
+    cache: CacheLRU | None = None,
+) -> bytes:
+    """PNG bytes of one figure (see exportar_pngs); b"" if it cannot be rendered."""
+    return exportar_pngs([fig], largura, altura, cache)[0]
@@ -0,0 +1,269 @@
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from collections.abc import Iterable, Iterator
+from io import TextIOWrapper
+from typing import BinaryIO
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+from pandas.api.types import is_float_dtype
+
+from src.constantes import MESES_PT
+from src.calculadora_lote import calcular_lote, resultado_unidade
+from src.logica_calculadora import COMPONENTES_ACL, COMPONENTES_ACR
+from src.resultado_simulacao import COLUNAS_MENSAIS, ResultadoSimulacao
+
+TAMANHO_BLOCO_EXPORTACAO = 500
+FORMATOS_PACOTE = ("parquet", "csv")
+# Workbooks with more valid units than this put the monthly detail of all
+# units in one long "Detalhe Mensal" sheet (split at Excel's row limit):
+# every worksheet keeps a temp file open until the workbook is closed
+MAX_ABAS_UNIDADE = 200
+MAX_LINHAS_EXCEL = 1_048_576
+
+COLUNAS_RESUMO = ["Linha", "Nome", "Distribuidora", "Desconto (%)", "Economia Total (R$)", "Economia VPL (R$)", "Erro"]
+COLUNAS_DETALHE = ["ano", "mes", "periodo", *COLUNAS_MENSAIS, *COMPONENTES_ACR, *COMPONENTES_ACL]
+_COLUNAS_UNIDADE = ["Linha", "Nome", "Distribuidora"]
+
+
+def _texto(nome) -> str:
+    return "" if nome is None or (isinstance(nome, float) and np.isnan(nome)) else str(nome)
+
+
+def _linha_resumo(numero: int, r: dict) -> list:
+    return [
+        numero,
+        _texto(r["Nome"]),
+        r["Distribuidora"],
+        round(r["Desconto"] * 100, 2) if r["Desconto"] else 0,
+        round(r["Economia Total"], 2),
+        round(r["Economia VPL"], 2),
+        r.get("_erro", ""),
+    ]
+
+
+def _blocos(
+    unidades: Iterable[dict], tamanho_bloco: int
+) -> Iterator[tuple[list[list], list[tuple[int, dict, ResultadoSimulacao]]]]:
+    """Per block of units: their summary rows and (line number, entry,
+    result) of the valid ones. Entries without _resultado (see
+    processar_multi_unitario's manter_detalhe) are recalculated from their
+    _params in one calcular_lote pass per block."""
+    bloco = []
+    for numero, r in enumerate(unidades, start=1):
+        bloco.append((numero, r))
+        if len(bloco) == tamanho_bloco:
+            yield _resolver_bloco(bloco)
+            bloco = []
+    if bloco:
+        yield _resolver_bloco(bloco)
+
+
+def _resolver_bloco(bloco: list[tuple[int, dict]]):
+    resumo = [_linha_resumo(numero, r) for numero, r in bloco]
+    recalcular = [(numero, r) for numero, r in bloco if "_resultado" not in r and "_params" in r]
+    lote = calcular_lote([r["_params"] for _, r in recalcular]) if recalcular else None
+    recalculados = {numero: resultado_unidade(lote, k) for k, (numero, _) in enumerate(recalcular)}
+    validos = [
+        (numero, r, r["_resultado"] if "_resultado" in r else recalculados[numero])
+        for numero, r in bloco
+        if "_resultado" in r or numero in recalculados
+    ]
+    return resumo, validos
+
+
+def _detalhe(validos: list[tuple[int, dict, ResultadoSimulacao]]) -> pd.DataFrame:
+    """Monthly detail of a block of units in long format: Linha, Nome,
+    Distribuidora and COLUNAS_DETALHE, one row per (unit, month)."""
+    tamanhos = [len(res.meses) for *_, res in validos]
+    meses = np.concatenate([res.meses for *_, res in validos] or [np.empty(0, dtype=np.int64)])
+    anos = np.concatenate([res.anos for *_, res in validos] or [np.empty(0, dtype=np.int64)])
+    nomes_meses = np.array(MESES_PT, dtype=object)[meses - 1]
+
+    def coluna(campo: str, origem: str) -> np.ndarray:
+        return np.concatenate([getattr(res, origem)[campo] for *_, res in validos] or [np.empty(0)])
+
+    return pd.DataFrame({
+        "Linha": np.repeat(np.array([numero for numero, *_ in validos], dtype=np.int64), tamanhos),
+        "Nome": np.repeat(np.array([_texto(r["Nome"]) for _, r, _ in validos], dtype=object), tamanhos),
+        "Distribuidora": np.repeat(np.array([r["Distribuidora"] for _, r, _ in validos], dtype=object), tamanhos),
+        "ano": anos,
+        "mes": meses,
+        "periodo": nomes_meses + "/" + anos.astype(str).astype(object),
+        **{c: coluna(c, "mensal") for c in COLUNAS_MENSAIS},
+        **{c: coluna(c, "acr") for c in COMPONENTES_ACR},
+        **{c: coluna(c, "acl") for c in COMPONENTES_ACL},
+    })
+
+
+def _linhas(df: pd.DataFrame) -> Iterator[tuple]:
+    """Rows of df as tuples of plain Python values (for xlsxwriter)."""
+    return zip(*(df[c].tolist() for c in df.columns))
+
+
+def _nome_aba(numero: int, nome, largura: int) -> str:
+    """Unique sheet name: line number + unit name, without the characters
+    Excel rejects, up to its 31-character limit."""
+    return re.sub(r"[\[\]:*?/\\']", "", f"{numero:0{largura}d} {_texto(nome)}").strip()[:31]
+
+
+def exportar_excel(
+    unidades: list[dict],
+    destino: str | BinaryIO,
+    detalhe: bool = True,
+    tamanho_bloco: int = TAMANHO_BLOCO_EXPORTACAO,
+) -> None:
+    """Write a processar_multi_unitario result to an .xlsx file.
+
+    "Resultados" holds one summary row per unit; with detalhe, each valid
+    unit's monthly ACR/ACL breakdown (COLUNAS_DETALHE) goes to a sheet of
+    its own, or, above MAX_ABAS_UNIDADE units, to long "Detalhe Mensal"
+    sheets. xlsxwriter's constant_memory mode flushes every row as it is
+    written and units are resolved tamanho_bloco at a time (see _blocos),
+    so memory does not grow with the portfolio.
+
+    Args:
+        unidades: 'unidades' of processar_multi_unitario, in sheet order.
+        destino: Path or writable binary file object.
+        detalhe: Also write the monthly detail.
+        tamanho_bloco: Units resolved per step.
+    """
+    wb = xlsxwriter.Workbook(destino, {"constant_memory": True})
+    negrito = wb.add_format({"bold": True})
+    moeda = wb.add_format({"num_format": "#,##0.00"})
+
+    resumo = wb.add_worksheet("Resultados")
+    resumo.write_row(0, 0, COLUNAS_RESUMO, negrito)
+    resumo.set_column(1, 1, 30)
+    resumo.set_column(4, 5, 18, moeda)
+    linha_resumo = 1
+
+    por_unidade = detalhe and sum("_resultado" in r or "_params" in r for r in unidades) <= MAX_ABAS_UNIDADE
+    largura = len(str(len(unidades)))
+    longa = None
+    linha_longa = MAX_LINHAS_EXCEL
+
+    for linhas_resumo, validos in _blocos(unidades, tamanho_bloco):
+        for valores in linhas_resumo:
+            resumo.write_row(linha_resumo, 0, valores)
+            linha_resumo += 1
+        if not detalhe or not validos:
+            continue
+        tabela = _detalhe(validos)
+        if por_unidade:
+            inicio = 0
+            for numero, r, res in validos:
+                aba = wb.add_worksheet(_nome_aba(numero, r["Nome"], largura))
+                aba.write_row(0, 0, COLUNAS_DETALHE, negrito)
+                parte = tabela.iloc[inicio:inicio + len(res.meses)][COLUNAS_DETALHE]
+                for i, valores in enumerate(_linhas(parte), start=1):
+                    aba.write_row(i, 0, valores)
+                inicio += len(res.meses)
+        else:
+            for valores in _linhas(tabela):
+                if linha_longa == MAX_LINHAS_EXCEL:
+                    n_abas = len(wb.worksheets())
+                    longa = wb.add_worksheet("Detalhe Mensal" + (f" {n_abas}" if n_abas > 1 else ""))
+                    longa.write_row(0, 0, list(tabela.columns), negrito)
+                    linha_longa = 1
+                longa.write_row(linha_longa, 0, valores)
+                linha_longa += 1
+
+    wb.close()
+
+
+def exportar_pacote(
+    unidades: list[dict],
+    destino: str | BinaryIO,
+    formato: str = "parquet",
+    tamanho_bloco: int = TAMANHO_BLOCO_EXPORTACAO,
+) -> None:
+    """Write a processar_multi_unitario result as a ZIP of two tables:
+    resumo (one row per unit, COLUNAS_RESUMO) and detalhe_mensal (one row
+    per unit and month: Linha, Nome, Distribuidora, COLUNAS_DETALHE).
+
+    Both are written block by block: Parquet as one row group per block
+    (staged in temp files, as the format needs a seekable output), CSV in
+    the templates' pt-BR dialect (";" separator, "," decimals, UTF-8 with
+    BOM), the detail streamed straight into the archive.
+
+    Args:
+        unidades: 'unidades' of processar_multi_unitario, in sheet order.
+        destino: Path or writable binary file object for the ZIP.
+        formato: One of FORMATOS_PACOTE.
+        tamanho_bloco: Units resolved per step.
+    """
+    if formato not in FORMATOS_PACOTE:
+        raise ValueError(f"Formato não suportado: '{formato}'. Formatos aceitos: {', '.join(FORMATOS_PACOTE)}")
+
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        if formato == "csv":
+            # zipfile takes one write handle at a time: the detail streams
+            # into the archive, the (one row per unit) summary is staged
+            with tempfile.TemporaryFile("w+", encoding="utf-8-sig", newline="") as t_resumo:
+                with zf.open("detalhe_mensal.csv", "w", force_zip64=True) as f_detalhe, \
+                        TextIOWrapper(f_detalhe, encoding="utf-8-sig", newline="") as t_detalhe:
+                    primeiro = True
+                    for linhas_resumo, validos in _blocos(unidades, tamanho_bloco):
+                        opcoes = {"sep": ";", "index": False, "header": primeiro}
+                        _decimais_br(pd.DataFrame(linhas_resumo, columns=COLUNAS_RESUMO)).to_csv(t_resumo, **opcoes)
+                        _decimais_br(_detalhe(validos)).to_csv(t_detalhe, **opcoes)
+                        primeiro = False
+                t_resumo.seek(0)
+                with zf.open("resumo.csv", "w") as f_resumo, \
+                        TextIOWrapper(f_resumo, encoding="utf-8-sig", newline="") as t_saida:
+                    shutil.copyfileobj(t_resumo, t_saida)
+            return
+
+        with tempfile.TemporaryDirectory() as pasta:
+            caminhos = {nome: os.path.join(pasta, f"{nome}.parquet") for nome in ("resumo", "detalhe_mensal")}
+            escritores = {}
+            try:
+                for linhas_resumo, validos in _blocos(unidades, tamanho_bloco):
+                    tabelas = {"resumo": _tipar_resumo(linhas_resumo), "detalhe_mensal": _detalhe(validos)}
+                    for nome, df in tabelas.items():
+                        if df.empty:
+                            continue
+                        tabela = pa.Table.from_pandas(df, preserve_index=False)
+                        if nome not in escritores:
+                            escritores[nome] = pq.ParquetWriter(caminhos[nome], tabela.schema)
+                        escritores[nome].write_table(tabela.cast(escritores[nome].schema))
+            finally:
+                for escritor in escritores.values():
+                    escritor.close()
+            for nome, caminho in caminhos.items():
+                if nome not in escritores:  # no rows: empty table with the columns
+                    colunas = COLUNAS_RESUMO if nome == "resumo" else [*_COLUNAS_UNIDADE, *COLUNAS_DETALHE]
+                    pq.write_table(pa.table({c: pa.array([], pa.null()) for c in colunas}), caminho)
+                zf.write(caminho, f"{nome}.parquet")
+
+
+def _decimais_br(df: pd.DataFrame) -> pd.DataFrame:
+    """Float columns as text with "," decimals. Same output as to_csv's
+    decimal=",", which formats value by value in Python; here it is one
+    vectorized pass per column."""
+    for c in df.columns:
+        if is_float_dtype(df[c]):
+            texto = pd.Series(df[c].to_numpy().astype(str), index=df.index, dtype="str")
+            df[c] = texto.str.replace(".", ",", regex=False).where(df[c].notna(), "")
+    return df
+
+
+def _tipar_resumo(linhas_resumo: list[list]) -> pd.DataFrame:
+    """Summary rows with fixed column types, so every Parquet row group
+    shares one schema."""
+    return pd.DataFrame(linhas_resumo, columns=COLUNAS_RESUMO).astype({
+        "Linha": np.int64,
+        "Nome": str,
+        "Distribuidora": str,
+        "Desconto (%)": float,
+        "Economia Total (R$)": float,
+        "Economia VPL (R$)": float,
+        "Erro": str,
+    })
@@ -1,5 +1,10 @@
+import pandas as pd
+from pyarrow import ArrowInvalid
+
 from src.constantes import MESES_PT
 
+_DECIMAL_SIMPLES = r"[+-]?(?:\d+\.?\d*|\.\d+)"
+
 
 def formatar_moeda(valor: float) -> str:
     """1234.56 → 'R$ 1.234,56'"""
@@ -36,6 +41,52 @@ def parse_valor_br(valor_str: str) -> float:
         return 0.0
 
 
+def parse_valor_br_series(valores: pd.Series) -> pd.Series:
+    """Vectorized parse_valor_br over a whole Series → float64 Series.
+
+    Strings follow parse_valor_br exactly (blank/',00'/malformed → 0.0,
+    '.' as thousands separator). Numeric cells pass through unchanged, so
+    spreadsheet columns mixing typed numbers and pt-BR text work too;
+    anything else (NaN, None) becomes 0.0.
+    """
+    if pd.api.types.is_numeric_dtype(valores):
+        return valores.astype(float).fillna(0.0)
+
+    if pd.api.types.infer_dtype(valores, skipna=True) in ("string", "empty"):
+        eh_texto = valores.notna()
+    else:
+        eh_texto = valores.map(lambda v: isinstance(v, str)).astype(bool)
+
+    # Arrow-backed strings keep every step below in compiled kernels
+    texto = valores.where(eh_texto).astype("string[pyarrow]")
+    normalizado = (
+        texto.str.strip()
+        .str.replace(".", "", regex=False)
+        .str.replace(",", ".", regex=False)
+    )
+
+    # Plain decimals: the Arrow cast rounds exactly like float(). Try the
+    # whole column first; only a malformed cell forces the regex pass.
+    try:
+        resultado = normalizado.replace("", "0").fillna("0").astype("float64[pyarrow]")
+        simples = eh_texto
+    except (ValueError, TypeError, ArrowInvalid):
+        simples = normalizado.str.fullmatch(_DECIMAL_SIMPLES).fillna(False).astype(bool)
+        resultado = normalizado.where(simples, "0").astype("float64[pyarrow]")
+    resultado = resultado.astype(float)
+
+    if not eh_texto.all():
+        nao_texto = pd.to_numeric(valores.where(~eh_texto), errors="coerce")
+        resultado = resultado.where(eh_texto, nao_texto).fillna(0.0)
+
+    # Anything else ('abc', '1_000', '1e3') goes through the scalar parser
+    outros = eh_texto & ~simples & normalizado.ne("").fillna(False).astype(bool)
+    if outros.any():
+        resultado = resultado.copy()
+        resultado[outros] = valores[outros].map(parse_valor_br)
+    return resultado
+
+
 def _formatar_numero_br(valor: float) -> str:
     """1234.56 → '1.234,56'"""
     inteiro = int(valor)
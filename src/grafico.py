@@ -182,3 +182,32 @@ def criar_grafico_comparativo(resultado_a: dict, resultado_b: dict,
     )
 
     return fig
+
+
+def criar_grafico_sensibilidade(varredura, valor: str = "economia_vpl") -> go.Figure:
+    """Heatmap of a varrer_oferta grid: offer (x) × NPV rate (y) → valor."""
+    ofertas = list(dict.fromkeys(varredura["oferta"]))
+    taxas = sorted(varredura["taxa_vpl"].unique())
+    grade = varredura.pivot_table(
+        index="taxa_vpl", columns="oferta", values=valor, sort=False
+    ).reindex(index=taxas, columns=ofertas)
+
+    fig = go.Figure(go.Heatmap(
+        x=ofertas,
+        y=[f"{t:g}%" for t in taxas],
+        z=grade.to_numpy(),
+        colorscale=[[0, "#f0f2f6"], [0.5, "#80c739"], [1, "#148c73"]],
+        customdata=[[formatar_moeda(v) for v in linha] for linha in grade.to_numpy()],
+        hovertemplate="Oferta: %{x}<br>Taxa VPL: %{y}<br>Valor: %{customdata}<extra></extra>",
+        colorbar=dict(tickprefix="R$ ", tickformat=",.0f"),
+    ))
+
+    fig.update_layout(
+        title="Sensibilidade da Economia VPL" if valor == "economia_vpl" else "Sensibilidade da Economia",
+        xaxis_title="Oferta",
+        yaxis_title="Taxa VPL (% a.a.)",
+        plot_bgcolor="white",
+        height=450,
+    )
+
+    return fig
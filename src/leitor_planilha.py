@@ -0,0 +1,296 @@
+import re
+from collections.abc import Iterator
+from io import BytesIO
+from typing import BinaryIO
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.api.types import is_numeric_dtype
+from pandas.io.parsers import TextParser
+
+ABA_UNIDADES = "Unidades"
+PREVIA_LINHAS = 100
+FORMATOS = ("xlsx", "csv", "parquet")
+
+# Column types of the units schema (TEMPLATE_COLUMNS) for the typed
+# formats; every other template column is a float. The offer column holds
+# a DG discount or a PD price list ("300, 310, 320"), so it stays text.
+COLUNAS_TEXTO = ("Nome", "Distribuidora", "SubGrupo", "Modalidade", "Tipo Energia", "Tipo ICMS", "Tipo Oferta")
+COLUNAS_INTEIRAS = ("Mes Inicio", "Ano Inicio", "Mes Fim", "Ano Fim")
+COLUNA_OFERTA = "Desconto (%) ou Precos"
+
+# Root tag of a sheet XML, with its namespace prefix if any (<x:worksheet>)
+_TAG_PLANILHA = re.compile(rb"<(?:([A-Za-z_][\w.-]*):)?worksheet[\s>]")
+_BLOCO_XML = 1 << 20
+
+# pt-BR number: "1.234,5" / "1234,5" / "12" ("." only as thousands separator)
+_NUMERO_BR = r"-?(?:\d{1,3}(?:\.\d{3})+|\d+)(?:,\d+)?"
+
+
+def detectar_formato(arquivo: bytes | BinaryIO) -> str:
+    """'xlsx' (ZIP signature), 'parquet' ('PAR1' magic) or 'csv' otherwise."""
+    if isinstance(arquivo, (bytes, bytearray)):
+        inicio = bytes(arquivo[:4])
+    else:
+        arquivo.seek(0)
+        inicio = arquivo.read(4)
+        arquivo.seek(0)
+    if inicio.startswith(b"PK"):
+        return "xlsx"
+    if inicio == b"PAR1":
+        return "parquet"
+    return "csv"
+
+
+def _conteudo(arquivo: bytes | BinaryIO) -> bytes:
+    if isinstance(arquivo, (bytes, bytearray)):
+        return bytes(arquivo)
+    arquivo.seek(0)
+    return arquivo.read()
+
+
+def _abrir(arquivo: bytes | BinaryIO):
+    """Read-only workbook, its units sheet ("Unidades", else the first) and
+    the sheet's row count including the header (see _contar_linhas).
+
+    The sheet's dimensions are reset once counted: the stored ones may be
+    wrong, so rows are read until the data ends (as pandas does).
+    """
+    if isinstance(arquivo, (bytes, bytearray)):
+        arquivo = BytesIO(arquivo)
+    elif hasattr(arquivo, "seek"):
+        arquivo.seek(0)
+    wb = load_workbook(arquivo, read_only=True, data_only=True, keep_links=False)
+    ws = wb[ABA_UNIDADES] if ABA_UNIDADES in wb.sheetnames else wb.worksheets[0]
+    linhas = _contar_linhas(ws)
+    ws.reset_dimensions()
+    return wb, ws, linhas
+
+
+def _contar_linhas(ws) -> int:
+    """Row count from the stored <dimension>, or, when the writer left it
+    out, from the <row> tags of the sheet XML (decompressed in blocks and
+    counted as bytes, no XML parsing). Either may include formatted blank
+    rows."""
+    if ws.max_row is not None:
+        return ws.max_row
+    linhas = 0
+    with ws._get_source() as xml:
+        bloco = xml.read(_BLOCO_XML)
+        raiz = _TAG_PLANILHA.search(bloco)
+        marca = b"<" + (raiz.group(1) + b":" if raiz and raiz.group(1) else b"") + b"row"
+        resto = b""
+        while bloco:
+            bloco = resto + bloco
+            linhas += bloco.count(marca + b" ") + bloco.count(marca + b">")
+            # The tail is carried over so a tag split between blocks is
+            # counted in the next one; it cannot hold a whole tag
+            resto = bloco[-len(marca):]
+            bloco = xml.read(_BLOCO_XML)
+    return linhas
+
+
+def _celula(valor):
+    """Cell value as pd.read_excel sees it: blanks "", errors NaN, whole floats int."""
+    if valor is None:
+        return ""
+    if isinstance(valor, str) and valor in ERROR_CODES:
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _linhas(ws) -> Iterator[list]:
+    """Converted rows with trailing blank cells trimmed. Blank rows are held
+    back until a later row has data, so trailing ones are dropped."""
+    vazias = 0
+    for valores in ws.iter_rows(values_only=True):
+        linha = [_celula(v) for v in valores]
+        while linha and linha[-1] == "":
+            linha.pop()
+        if not linha:
+            vazias += 1
+            continue
+        for _ in range(vazias):
+            yield []
+        vazias = 0
+        yield linha
+
+
+def _montar_bloco(cabecalho: list, linhas: list[list], inicio: int) -> pd.DataFrame:
+    """DataFrame of one block, parsed like pd.read_excel (header row,
+    NA strings, type inference) and indexed from its first row number."""
+    dados = [cabecalho] + linhas
+    largura = max(len(linha) for linha in dados)
+    dados = [linha + [""] * (largura - len(linha)) for linha in dados]
+    df = TextParser(dados, header=0, skip_blank_lines=False).read()
+    df.index = pd.RangeIndex(inicio, inicio + len(df))
+    return df
+
+
+class PlanilhaUnidades:
+    """Units sheet of an upload, opened once in openpyxl's read-only mode.
+
+    total is the row count below the header, from the sheet's stored
+    dimension or its row tags (no cell parsing; may include trailing
+    blank rows). blocos() streams the rows as DataFrames, so only one block
+    is in memory at a time.
+    """
+
+    def __init__(self, arquivo: bytes | BinaryIO):
+        self._wb, self._ws, linhas = _abrir(arquivo)
+        self.total = max(linhas - 1, 0)
+
+    def blocos(self, tamanho_bloco: int) -> Iterator[pd.DataFrame]:
+        """DataFrames of up to tamanho_bloco rows. Concatenated, they equal
+        pd.read_excel of the same sheet (each block infers its own column
+        dtypes). Closes the workbook when exhausted."""
+        try:
+            linhas = _linhas(self._ws)
+            cabecalho = next(linhas, None)
+            if cabecalho is None:
+                return
+            bloco = []
+            inicio = 0
+            for linha in linhas:
+                bloco.append(linha)
+                if len(bloco) == tamanho_bloco:
+                    yield _montar_bloco(cabecalho, bloco, inicio)
+                    inicio += len(bloco)
+                    bloco = []
+            if bloco:
+                yield _montar_bloco(cabecalho, bloco, inicio)
+        finally:
+            self.fechar()
+
+    def fechar(self) -> None:
+        self._wb.close()
+
+
+def _numeros_br(serie: pd.Series) -> pd.Series:
+    """pt-BR numeric text → float64; plain decimals ("6.5", "1e3") are
+    accepted too. Cells that are neither keep their text (the validator
+    reports them), making the column object."""
+    texto = serie.str.strip()
+    br = texto.str.fullmatch(_NUMERO_BR).fillna(False).astype(bool)
+    valores = pd.to_numeric(
+        texto.where(br).str.replace(".", "", regex=False).str.replace(",", ".", regex=False),
+        errors="coerce",
+    )
+    valores = valores.fillna(pd.to_numeric(texto.where(~br), errors="coerce")).astype(float)
+    invalidos = valores.isna() & serie.notna()
+    if not invalidos.any():
+        return valores
+    return valores.astype(object).where(~invalidos, serie.astype(object))
+
+
+class CsvUnidades:
+    """Units table as a semicolon-separated pt-BR CSV (UTF-8, else latin-1).
+
+    Read in chunks by pandas' C parser with decimal=",": text columns as
+    str, numeric ones typed by the parser. A numeric column the parser
+    leaves as text (thousands separators, dot decimals, invalid cells)
+    goes through _numeros_br, as do DG discounts; PD price lists keep the
+    "300, 310, 320" form.
+    """
+
+    def __init__(self, arquivo: bytes | BinaryIO):
+        self._dados = _conteudo(arquivo)
+        try:
+            self._dados.decode("utf-8")
+            self._encoding = "utf-8-sig"
+        except UnicodeDecodeError:
+            self._encoding = "latin-1"
+        self.total = self._contar_registros()
+
+    def _contar_registros(self) -> int:
+        """Record count by the same parser, reading only the first column:
+        quoted multi-line cells and blank lines are handled as in blocos()."""
+        if not self._dados.strip():
+            return 0
+        leitor = pd.read_csv(
+            BytesIO(self._dados), sep=";", encoding=self._encoding, usecols=[0],
+            dtype=str, chunksize=1 << 16,
+        )
+        with leitor:
+            return sum(len(bloco) for bloco in leitor)
+
+    def blocos(self, tamanho_bloco: int) -> Iterator[pd.DataFrame]:
+        if not self._dados.strip():
+            return
+        leitor = pd.read_csv(
+            BytesIO(self._dados), sep=";", decimal=",", encoding=self._encoding,
+            dtype={c: str for c in (*COLUNAS_TEXTO, COLUNA_OFERTA)}, chunksize=tamanho_bloco,
+        )
+        with leitor:
+            for bloco in leitor:
+                yield self._tipar(bloco)
+
+    @staticmethod
+    def _tipar(bloco: pd.DataFrame) -> pd.DataFrame:
+        for coluna in bloco.columns:
+            if coluna not in COLUNAS_TEXTO and coluna != COLUNA_OFERTA and not is_numeric_dtype(bloco[coluna]):
+                bloco[coluna] = _numeros_br(bloco[coluna].astype(str).where(bloco[coluna].notna()))
+        if COLUNA_OFERTA in bloco:
+            dg = (
+                bloco["Tipo Oferta"].eq("Desconto Garantido").fillna(False).astype(bool)
+                if "Tipo Oferta" in bloco else pd.Series(True, index=bloco.index)
+            )
+            oferta = bloco[COLUNA_OFERTA].astype(object)
+            oferta[dg] = _numeros_br(bloco.loc[dg, COLUNA_OFERTA]).astype(object)
+            bloco[COLUNA_OFERTA] = oferta
+        return bloco
+
+
+class ParquetUnidades:
+    """Units table as Parquet, streamed in record batches by pyarrow with
+    the column types stored in the file."""
+
+    def __init__(self, arquivo: bytes | BinaryIO):
+        if isinstance(arquivo, (bytes, bytearray)):
+            arquivo = BytesIO(arquivo)
+        else:
+            arquivo.seek(0)
+        self._arquivo = pq.ParquetFile(arquivo)
+        self.total = self._arquivo.metadata.num_rows
+
+    def blocos(self, tamanho_bloco: int) -> Iterator[pd.DataFrame]:
+        inicio = 0
+        for lote in self._arquivo.iter_batches(batch_size=tamanho_bloco):
+            bloco = lote.to_pandas()
+            bloco.index = pd.RangeIndex(inicio, inicio + len(bloco))
+            inicio += len(bloco)
+            yield bloco
+
+
+def abrir_unidades(
+    arquivo: bytes | BinaryIO, formato: str | None = None
+) -> PlanilhaUnidades | CsvUnidades | ParquetUnidades:
+    """Streaming reader for an upload in any of FORMATOS (detected when
+    formato is None). All readers expose total and blocos(tamanho_bloco)."""
+    formato = formato or detectar_formato(arquivo)
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato não suportado: '{formato}'. Formatos aceitos: {', '.join(FORMATOS)}")
+    leitor = {"xlsx": PlanilhaUnidades, "csv": CsvUnidades, "parquet": ParquetUnidades}[formato]
+    return leitor(arquivo)
+
+
+def ler_previa(arquivo: bytes | BinaryIO, n_linhas: int = PREVIA_LINHAS) -> tuple[pd.DataFrame, int]:
+    """First n_linhas units for display, and the file's unit count.
+
+    Only the head of the file is parsed; the count is the reader's total,
+    and exact whenever the file fits in the preview.
+    """
+    leitor = abrir_unidades(arquivo)
+    blocos = leitor.blocos(n_linhas + 1)
+    previa = next(blocos, None)
+    blocos.close()
+    if previa is None:
+        return pd.DataFrame(), 0
+    if len(previa) <= n_linhas:
+        return previa, len(previa)
+    return previa.iloc[:n_linhas], max(leitor.total, len(previa))
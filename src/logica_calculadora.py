@@ -2,20 +2,89 @@ import numpy as np
 import numpy_financial as npf
 from src.models import ParametrosSimulacao, TarifasVigentes
 from src.constantes import TIPO_ENERGIA, TIPO_ICMS, MESES_PT, REAJUSTE_ANUAL_PADRAO
+from src.resultado_simulacao import ResultadoSimulacao
+
+
+MOTOR_ESCALAR = "escalar"    # one TarifasVigentes + dicts per month (reference)
+MOTOR_VETORIAL = "vetorial"  # whole contract horizon as NumPy arrays
+
+# Guard: cap at 360 months (30 years) to prevent runaway loops
+MAX_MESES = 360
+
+COMPONENTES_ACR = ["fio", "fio_pis", "fio_icms", "energia", "energia_pis", "energia_icms", "custo_total_acr"]
+COMPONENTES_ACL = ["fio_acl", "energia_cg", "energia_acl", "energia_final", "custo_total_acl"]
+
+# Vectorized engine stages in dependency order, with the inputs each one
+# reads directly. A stage reruns when its inputs or any upstream stage change.
+ETAPAS = ("tarifas", "acr", "acl", "agregacao")
+_ENTRADAS_ETAPA = {
+    "tarifas": lambda p: (
+        p.tarifas.model_dump(),
+        p.contrato.mes_inicio, p.contrato.ano_inicio, p.contrato.mes_fim, p.contrato.ano_fim,
+    ),
+    "acr": lambda p: (
+        p.consumo.model_dump(),
+        p.tributarios.aliquota_icms, p.tributarios.aliquota_pis_cofins,
+        p.modalidade,
+    ),
+    "acl": lambda p: (
+        p.oferta.model_dump(),
+        p.tributarios.tipo_energia, p.tributarios.tipo_icms, p.tributarios.despesas_ccee,
+    ),
+    "agregacao": lambda p: (p.contrato.taxa_vpl,),
+}
 
 
 class LogicaCalculadora:
 
-    def __init__(self, params: ParametrosSimulacao):
+    def __init__(self, params: ParametrosSimulacao, motor: str = MOTOR_VETORIAL):
         self.params = params
+        self.motor = motor
+        self._entradas = {}  # stage -> inputs it was last computed with
+        self.etapas_recalculadas = []
 
     def calcular(self) -> dict:
+        if self.motor == MOTOR_ESCALAR:
+            self._preparar_dados()
+            self._construir_serie_tarifas()
+            self._calcular_mensal()
+            self._agregar_anual()
+            return self._montar_resultado()
+        return self.atualizar(self.params)
+
+    def atualizar(self, params: ParametrosSimulacao) -> dict:
+        """Vectorized result for params, reusing the stages of the previous call.
+
+        Only the stages downstream of a changed input are recomputed: a new
+        offer reruns ACL and aggregation, a new NPV rate only aggregation.
+        self.etapas_recalculadas lists the stages that ran.
+        """
+        self.params = params
         self._preparar_dados()
-        self._construir_serie_tarifas()
-        self._calcular_mensal()
-        self._agregar_anual()
+        self.etapas_recalculadas = []
+        for etapa in ETAPAS:
+            entradas = _ENTRADAS_ETAPA[etapa](params)
+            if self.etapas_recalculadas or self._entradas.get(etapa) != entradas:
+                self._entradas.pop(etapa, None)
+                getattr(self, f"_etapa_{etapa}")()
+                self._entradas[etapa] = entradas
+                self.etapas_recalculadas.append(etapa)
         return self._montar_resultado()
 
+    def _etapa_tarifas(self):
+        self._construir_serie_tarifas_vetorial()
+        self.year_idx = self.anos - self.ano_inicio
+
+    def _etapa_acr(self):
+        self.acr = self._calcular_acr_vetorial(self.tarifas_mensais)
+
+    def _etapa_acl(self):
+        self.acl = self._calcular_acl_vetorial(self.tarifas_mensais, self.acr, self.year_idx)
+        self._calcular_mensal_vetorial()
+
+    def _etapa_agregacao(self):
+        self._agregar_anual_vetorial()
+
     def _preparar_dados(self):
         c = self.params.consumo
         t = self.params.tributarios
@@ -73,12 +142,10 @@ class LogicaCalculadora:
         ano = self.ano_inicio
         ano_base = self.ano_inicio
 
-        # Guard: cap at 360 months (30 years) to prevent runaway loops
-        max_meses = 360
         count = 0
 
         while (ano < self.ano_fim) or (ano == self.ano_fim and mes <= self.mes_fim):
-            if count >= max_meses:
+            if count >= MAX_MESES:
                 break
             count += 1
             anos_projecao = ano - ano_base
@@ -255,6 +322,164 @@ class LogicaCalculadora:
                 "acl_detalhado": acl,
             })
 
+    def _construir_serie_tarifas_vetorial(self):
+        """Array version of _construir_serie_tarifas.
+
+        self.meses / self.anos: int arrays, one entry per contract month.
+        self.fatores: projection factor per month.
+        self.tarifas_mensais: {component: array} of projected tariffs.
+        """
+        n = (self.ano_fim - self.ano_inicio) * 12 + (self.mes_fim - self.mes_inicio) + 1
+        n = min(max(n, 0), MAX_MESES)
+
+        deslocamento = np.arange(n) + (self.mes_inicio - 1)
+        self.meses = deslocamento % 12 + 1
+        self.anos = self.ano_inicio + deslocamento // 12
+        self.fatores = (1 + REAJUSTE_ANUAL_PADRAO) ** (self.anos - self.ano_inicio).astype(float)
+
+        base = self.params.tarifas
+        self.tarifas_mensais = {
+            campo: getattr(base, campo) * self.fatores
+            for campo in ("tusd_kw_fp", "tusd_kw_p", "tusd_mwh_fp", "tusd_mwh_p", "te_fp", "te_p")
+        }
+
+    def _calcular_acr_vetorial(self, t: dict) -> dict:
+        """_calcular_acr_mes over arrays of monthly tariffs."""
+        if self.is_azul:
+            fio = (
+                (t["tusd_kw_p"] * self.dem_hp + t["tusd_kw_fp"] * self.dem_hfp)
+                / self.consumo_total_mwh
+                + t["tusd_mwh_p"] * self.prop_hp
+                + t["tusd_mwh_fp"] * self.prop_hfp
+            )
+        else:
+            fio = (
+                t["tusd_kw_fp"] * (self.dem_hp + self.dem_hfp)
+                / self.consumo_total_mwh
+                + t["tusd_mwh_fp"]
+            )
+
+        zeros = np.zeros_like(fio)
+        fio_pis = fio / (1 - self.aliq_pis) - fio if self.aliq_pis < 1 else zeros
+        fio_icms = fio / (1 - self.aliq_icms) - fio if self.aliq_icms < 1 else zeros
+
+        energia = t["te_fp"] * self.prop_hfp + t["te_p"] * self.prop_hp
+        energia_pis = energia / (1 - self.aliq_pis) - energia if self.aliq_pis < 1 else zeros
+        energia_icms = energia / (1 - self.aliq_icms) - energia if self.aliq_icms < 1 else zeros
+
+        custo_acr = fio + fio_pis + fio_icms + energia + energia_pis + energia_icms
+
+        return {
+            "fio": fio,
+            "fio_pis": fio_pis,
+            "fio_icms": fio_icms,
+            "energia": energia,
+            "energia_pis": energia_pis,
+            "energia_icms": energia_icms,
+            "custo_total_acr": custo_acr,
+        }
+
+    def _fio_acl_vetorial(self, t: dict) -> np.ndarray:
+        """ACL wire cost (fio_acl of _calcular_acl_mes) over monthly arrays."""
+        if self.is_azul:
+            return (
+                self.num_energia
+                * (t["tusd_kw_p"] * self.dem_hp + t["tusd_kw_fp"] * self.dem_hfp)
+                / self.consumo_total_mwh
+                + t["tusd_mwh_p"]
+            )
+        return (
+            self.num_energia
+            * t["tusd_kw_fp"] * (self.dem_hp + self.dem_hfp)
+            / self.consumo_total_mwh
+        )
+
+    def _bruto_pd(self, energia_acl):
+        """Tax gross-up of a raw PD energy price by ICMS type (scalar or array)."""
+        energia_final = energia_acl
+        if self.num_icms == 2:  # SP: Contribuinte - ICMS padrão
+            if self.aliq_icms < 1:
+                energia_final = energia_final / (1 - self.aliq_icms)
+            if self.aliq_pis < 1:
+                energia_final = energia_final / (1 - self.aliq_pis)
+        elif self.num_icms == 3:  # SNICMS: Contribuinte - ICMS 0%
+            if self.aliq_pis < 1:
+                energia_final = energia_final / (1 - self.aliq_pis)
+        return energia_final
+
+    def _calcular_acl_vetorial(self, t: dict, acr: dict, year_idx: np.ndarray) -> dict:
+        """_calcular_acl_mes over arrays of monthly tariffs."""
+        fio_acl = self._fio_acl_vetorial(t)
+        energia_cg = acr["custo_total_acr"] - fio_acl
+
+        if self.tipo_oferta == "Desconto Garantido":
+            energia_acl = energia_cg * (1 - self.desconto_garantido / 100.0)
+            energia_final = energia_acl
+        else:
+            if self.precos_por_ano:
+                # Years past the list reuse the last known price
+                precos = np.asarray(self.precos_por_ano, dtype=float)
+                energia_acl = precos[np.minimum(year_idx, len(precos) - 1)]
+            else:
+                energia_acl = energia_cg
+            energia_final = self._bruto_pd(energia_acl)
+
+        custo_acl = fio_acl + energia_final + self.despesas_ccee
+
+        return {
+            "fio_acl": fio_acl,
+            "energia_cg": energia_cg,
+            "energia_acl": energia_acl,
+            "energia_final": energia_final,
+            "custo_total_acl": custo_acl,
+        }
+
+    def _calcular_mensal_vetorial(self):
+        """Array version of _calcular_mensal, from self.acr / self.acl.
+
+        Fills self.mensal (custo_acr_mwh, custo_acl_mwh, desconto, economia,
+        gasto_acr, gasto_acl arrays); the per-month dicts are only built on
+        access (see ResultadoSimulacao).
+        """
+        custo_acr = self.acr["custo_total_acr"]
+        custo_acl = self.acl["custo_total_acl"]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            desconto = np.where(custo_acr != 0, 1 - custo_acl / custo_acr, 0.0)
+
+        self.mensal = {
+            "custo_acr_mwh": custo_acr,
+            "custo_acl_mwh": custo_acl,
+            "desconto": desconto,
+            "economia": (custo_acr - custo_acl) * self.consumo_total_mwh,
+            "gasto_acr": custo_acr * self.consumo_total_mwh,
+            "gasto_acl": custo_acl * self.consumo_total_mwh,
+        }
+
+    def _agregar_anual_vetorial(self):
+        """Array version of _agregar_anual (same sums, via bincount).
+
+        Fills self.anual ({COLUNAS_ANUAIS: array}) and self.economia_vpl.
+        """
+        anos_unicos, posicao = np.unique(self.anos, return_inverse=True)
+        gasto_acr = np.bincount(posicao, weights=self.mensal["gasto_acr"], minlength=len(anos_unicos))
+        gasto_acl = np.bincount(posicao, weights=self.mensal["gasto_acl"], minlength=len(anos_unicos))
+        economia = np.bincount(posicao, weights=self.mensal["economia"], minlength=len(anos_unicos))
+        meses = np.bincount(posicao, minlength=len(anos_unicos))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            desconto = np.where(gasto_acr != 0, 1 - gasto_acl / gasto_acr, 0.0)
+
+        self.anual = {
+            "ano": anos_unicos,
+            "gasto_acr": gasto_acr,
+            "gasto_acl": gasto_acl,
+            "economia": economia,
+            "desconto": desconto,
+            "meses": meses,
+        }
+        self._calcular_vpl(economia.tolist())
+
     def _agregar_anual(self):
         """Aggregate monthly results into annual totals and compute NPV.
 
@@ -296,8 +521,10 @@ class LogicaCalculadora:
                 "meses": dados["meses"],
             })
 
-        # NPV calculation
-        economias_anuais = [r["economia"] for r in self.resultados_anuais]
+        self._calcular_vpl([r["economia"] for r in self.resultados_anuais])
+
+    def _calcular_vpl(self, economias_anuais: list[float]):
+        """NPV of the annual savings at the contract's annual rate."""
         taxa_anual = (1 + self.taxa_mensal_vpl) ** 12 - 1
 
         if len(economias_anuais) > 0 and taxa_anual > 0:
@@ -307,16 +534,41 @@ class LogicaCalculadora:
             self.economia_vpl = sum(economias_anuais)
 
     def _montar_resultado(self) -> dict:
-        """Assemble the final results dictionary."""
-        economia_total = sum(r["economia"] for r in self.resultados_mensais)
-        gasto_acr_total = sum(r["gasto_acr"] for r in self.resultados_mensais)
-        gasto_acl_total = sum(r["gasto_acl"] for r in self.resultados_mensais)
+        """Assemble the final results: a dict on the scalar engine, a
+        columnar ResultadoSimulacao (same keys) on the vectorized one."""
+        if self.motor == MOTOR_ESCALAR:
+            economia_total = sum(r["economia"] for r in self.resultados_mensais)
+            gasto_acr_total = sum(r["gasto_acr"] for r in self.resultados_mensais)
+            gasto_acl_total = sum(r["gasto_acl"] for r in self.resultados_mensais)
+        else:
+            economia_total = float(self.mensal["economia"].sum())
+            gasto_acr_total = float(self.mensal["gasto_acr"].sum())
+            gasto_acl_total = float(self.mensal["gasto_acl"].sum())
 
         desconto_geral = (
             1 - (gasto_acl_total / gasto_acr_total)
             if gasto_acr_total != 0
             else 0.0
         )
+        periodo = [
+            f"{MESES_PT[self.mes_inicio - 1]}/{self.ano_inicio}",
+            f"{MESES_PT[self.mes_fim - 1]}/{self.ano_fim}",
+        ]
+
+        if self.motor != MOTOR_ESCALAR:
+            return ResultadoSimulacao(
+                meses=self.meses,
+                anos=self.anos,
+                mensal=self.mensal,
+                acr=self.acr,
+                acl=self.acl,
+                anual=self.anual,
+                desconto_geral=desconto_geral,
+                economia_total=economia_total,
+                economia_vpl=float(self.economia_vpl),
+                periodo=periodo,
+                tarifas_utilizadas=self.params.tarifas,
+            )
 
         return {
             "resultados_mensais": self.resultados_mensais,
@@ -324,13 +576,25 @@ class LogicaCalculadora:
             "desconto_geral": desconto_geral,
             "economia_total": economia_total,
             "economia_vpl": float(self.economia_vpl),
-            "periodo": [
-                f"{MESES_PT[self.mes_inicio - 1]}/{self.ano_inicio}",
-                f"{MESES_PT[self.mes_fim - 1]}/{self.ano_fim}",
-            ],
+            "periodo": periodo,
             "gastos_acl_anual": [r["gasto_acl"] for r in self.resultados_anuais],
             "gastos_acr_anual": [r["gasto_acr"] for r in self.resultados_anuais],
             "economias_anual": [r["economia"] for r in self.resultados_anuais],
             "anos": [str(r["ano"]) for r in self.resultados_anuais],
             "tarifas_utilizadas": self.params.tarifas,
         }
+
+
+def preparar_calculadora(params: ParametrosSimulacao) -> LogicaCalculadora:
+    """LogicaCalculadora with the offer-independent stages already run.
+
+    Sets calc.acr, calc.fio_acl, calc.energia_cg and calc.year_idx, which
+    depend only on tariffs, consumption and taxes.
+    """
+    calc = LogicaCalculadora(params)
+    calc._preparar_dados()
+    calc._etapa_tarifas()
+    calc._etapa_acr()
+    calc.fio_acl = calc._fio_acl_vetorial(calc.tarifas_mensais)
+    calc.energia_cg = calc.acr["custo_total_acr"] - calc.fio_acl
+    return calc
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 
 
@@ -46,6 +46,12 @@ class TarifasVigentes(BaseModel):
     vigencia: str = ""          # Vigência date string
 
 
+class TarifasCongeladas(TarifasVigentes):
+    """Read-only TarifasVigentes, for results shared through a cache."""
+
+    model_config = ConfigDict(frozen=True)
+
+
 class ParametrosSimulacao(BaseModel):
     consumo: DadosConsumo
     tributarios: DadosTributarios
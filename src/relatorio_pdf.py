@@ -4,6 +4,11 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.colors import HexColor
 from reportlab.lib.units import mm
 from reportlab.platypus import Table, TableStyle
+from reportlab.graphics import renderPDF
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.pdfbase.pdfmetrics import stringWidth
 
 from src.formatacao import formatar_moeda, formatar_percentual
 
@@ -15,16 +20,22 @@ CINZA_CLARO = HexColor("#f0f2f6")
 BRANCO = HexColor("#FFFFFF")
 PRETO = HexColor("#262730")
 MARGEM = 40
+# Chart area on page 2: 160mm × 100mm
+GRAFICO_W = 160 * mm
+GRAFICO_H = 100 * mm
 
 
 def gerar_relatorio(nome_cliente: str, desconto: float, economia: float,
-                    periodo: list[str], grafico_png: bytes,
+                    periodo: list[str], grafico_png: bytes | None,
                     resultados_anuais: list[dict],
-                    numero_unidade: int = 0) -> bytes:
+                    numero_unidade: int = 0,
+                    grafico_series: tuple[list, list, list] | None = None) -> bytes:
     """Returns PDF bytes for st.download_button.
 
     Page 1 — Executive Summary
-    Page 2 — Full Chart
+    Page 2 — Full Chart: grafico_png (Plotly export) when given, else the
+             chart drawn as vectors from grafico_series
+             (gastos_acl_anual, economias_anual, anos), needing no browser
     Page 3 — Annual Results Table
     """
     buf = BytesIO()
@@ -33,7 +44,7 @@ def gerar_relatorio(nome_cliente: str, desconto: float, economia: float,
     _pagina_resumo(c, nome_cliente, desconto, economia, periodo, numero_unidade)
     c.showPage()
 
-    _pagina_grafico(c, grafico_png)
+    _pagina_grafico(c, grafico_png, grafico_series)
     c.showPage()
 
     _pagina_tabela(c, resultados_anuais, desconto, economia)
@@ -96,8 +107,9 @@ def _pagina_resumo(c: canvas.Canvas, nome_cliente: str, desconto: float,
     _rodape(c)
 
 
-def _pagina_grafico(c: canvas.Canvas, grafico_png: bytes):
-    """Page 2: Full chart image."""
+def _pagina_grafico(c: canvas.Canvas, grafico_png: bytes | None,
+                    grafico_series: tuple[list, list, list] | None = None):
+    """Page 2: Full chart (PNG image, else vector chart)."""
     # Header
     c.setFillColor(VERDE_ESCURO)
     c.rect(0, PAGE_H - 60, PAGE_W, 60, fill=1, stroke=0)
@@ -105,24 +117,24 @@ def _pagina_grafico(c: canvas.Canvas, grafico_png: bytes):
     c.setFont("Helvetica-Bold", 18)
     c.drawString(MARGEM, PAGE_H - 40, "Gastos ACL e Economia por Ano")
 
+    x = (PAGE_W - GRAFICO_W) / 2
+    y = (PAGE_H - 60 - GRAFICO_H) / 2
+    desenhado = False
     if grafico_png and len(grafico_png) > 0:
         from reportlab.lib.utils import ImageReader
         img_buf = BytesIO(grafico_png)
         try:
             img = ImageReader(img_buf)
-            # Center the chart: 140mm wide × 90mm tall
-            img_w = 160 * mm
-            img_h = 100 * mm
-            x = (PAGE_W - img_w) / 2
-            y = (PAGE_H - 60 - img_h) / 2
-            c.drawImage(img, x, y, width=img_w, height=img_h,
+            # Center the chart: 160mm wide × 100mm tall
+            c.drawImage(img, x, y, width=GRAFICO_W, height=GRAFICO_H,
                         preserveAspectRatio=True, anchor="c")
+            desenhado = True
         except Exception:
-            c.setFillColor(PRETO)
-            c.setFont("Helvetica", 12)
-            c.drawCentredString(PAGE_W / 2, PAGE_H / 2,
-                                "Gráfico não disponível")
-    else:
+            pass
+    if not desenhado and grafico_series is not None and len(grafico_series[2]) > 0:
+        renderPDF.draw(desenhar_grafico_economia(*grafico_series), c, x, y)
+        desenhado = True
+    if not desenhado:
         c.setFillColor(PRETO)
         c.setFont("Helvetica", 12)
         c.drawCentredString(PAGE_W / 2, PAGE_H / 2,
@@ -131,6 +143,89 @@ def _pagina_grafico(c: canvas.Canvas, grafico_png: bytes):
     _rodape(c)
 
 
+def desenhar_grafico_economia(gastos_acl: list, economias: list, anos: list,
+                              largura: float = GRAFICO_W,
+                              altura: float = GRAFICO_H) -> Drawing:
+    """Vector version of grafico.criar_grafico_economia: stacked bars of
+    ACL cost (dark green) + savings (light green) per year, with bar
+    labels, R$ Y-axis and legend. Same series as the Plotly chart."""
+    d = Drawing(largura, altura)
+
+    chart = VerticalBarChart()
+    inclinado = len(anos) > 12
+    chart.x = 55
+    chart.y = 45 if inclinado else 30
+    chart.width = largura - chart.x - 10
+    chart.height = altura - chart.y - 30
+    chart.data = [list(gastos_acl), list(economias)]
+    chart.categoryAxis.categoryNames = [str(a) for a in anos]
+    chart.categoryAxis.style = "stacked"
+    chart.categoryAxis.labels.fontName = "Helvetica"
+    chart.categoryAxis.labels.fontSize = 8
+    if inclinado:
+        chart.categoryAxis.labels.angle = 45
+        chart.categoryAxis.labels.boxAnchor = "ne"
+    chart.categoryAxis.strokeColor = HexColor("#cccccc")
+    chart.valueAxis.valueMin = min(0, *(a + e for a, e in zip(gastos_acl, economias)))
+    chart.valueAxis.rangeRound = "both"
+    chart.valueAxis.labels.fontName = "Helvetica"
+    chart.valueAxis.labels.fontSize = 7
+    chart.valueAxis.labelTextFormat = lambda v: "R$ " + f"{v:,.0f}".replace(",", ".")
+    chart.valueAxis.strokeColor = HexColor("#cccccc")
+    chart.valueAxis.visibleGrid = True
+    chart.valueAxis.gridStrokeColor = HexColor("#eeeeee")
+    chart.bars.strokeColor = None
+    chart.bars[0].fillColor = VERDE_ESCURO
+    chart.bars[1].fillColor = VERDE_CLARO
+    chart.barSpacing = 0
+    chart.groupSpacing = chart.barWidth / 4  # bars fill 80% of each year, as Plotly
+    chart.barLabels.boxTarget = "mid"
+    chart.barLabels.fontName = "Helvetica"
+    chart.barLabels.fontSize = 6
+    # Stacked bars fill barWidth / (barWidth + groupSpacing) of each category
+    largura_barra = chart.width / max(len(anos), 1) * chart.barWidth / (chart.barWidth + chart.groupSpacing)
+    chart.barLabelFormat = _rotulo_barra(largura_barra, chart.barLabels.fontSize)
+    chart.barLabels.fillColor = BRANCO
+    d.add(chart)
+
+    legenda = Legend()
+    legenda.alignment = "right"
+    legenda.columnMaximum = 1
+    legenda.x = largura - 170
+    legenda.y = altura - 8
+    legenda.fontName = "Helvetica"
+    legenda.fontSize = 8
+    legenda.dxTextSpace = 4
+    legenda.deltax = 80
+    legenda.strokeColor = None
+    legenda.colorNamePairs = [(VERDE_ESCURO, "Custo ACL"), (VERDE_CLARO, "Economia")]
+    d.add(legenda)
+
+    d.add(String(chart.x + chart.width / 2, 4, "Ano", fontName="Helvetica",
+                 fontSize=8, textAnchor="middle", fillColor=PRETO))
+    return d
+
+
+def _rotulo_barra(largura_barra: float, tamanho_fonte: float):
+    """Bar label formatter: full R$ value, else compact ("R$ 1,2 mi"),
+    else no label, whichever fits the bar width."""
+    def formatar(valor: float) -> str:
+        for rotulo in (formatar_moeda(valor), _moeda_compacta(valor)):
+            if stringWidth(rotulo, "Helvetica", tamanho_fonte) <= largura_barra - 2:
+                return rotulo
+        return ""
+    return formatar
+
+
+def _moeda_compacta(valor: float) -> str:
+    """1234567.8 → 'R$ 1,2 mi' | 12345 → 'R$ 12 mil'"""
+    if abs(valor) >= 1e6:
+        return f"R$ {valor / 1e6:.1f} mi".replace(".", ",")
+    if abs(valor) >= 1e3:
+        return f"R$ {valor / 1e3:.0f} mil"
+    return f"R$ {valor:.0f}"
+
+
 def _pagina_tabela(c: canvas.Canvas, resultados_anuais: list[dict],
                    desconto_geral: float, economia_total: float):
     """Page 3: Annual results table."""
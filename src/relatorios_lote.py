@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import re
+import zipfile
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from typing import BinaryIO
+
+import numpy as np
+
+from src.cliente_multi_unitario import CONTEXTO_PROCESSOS
+from src.relatorio_pdf import gerar_relatorio
+from src.grafico import criar_grafico_economia
+from src.exportar_grafico import exportar_pngs, iniciar_renderizador
+
+# Bulk PDF reports: smallest unit count worth a worker pool (each report
+# costs a chart render, far more than a block of calculations) and
+# reports per worker task (their charts are rendered in one batch)
+MIN_RELATORIOS_PARALELO = 20
+RELATORIOS_POR_TAREFA = 10
+# Chart backends of the PDF reports: vectors drawn by ReportLab (no
+# browser) or the Plotly chart exported to PNG by kaleido
+BACKENDS_GRAFICO = ("reportlab", "plotly")
+BACKEND_GRAFICO_LOTE = "reportlab"
+
+
+def gerar_relatorios_zip(
+    unidades: list[dict],
+    destino: str | BinaryIO,
+    n_processos: int | None = None,
+    progress_callback=None,
+    backend_grafico: str = BACKEND_GRAFICO_LOTE,
+) -> int:
+    """Write one PDF report (gerar_relatorio) per valid unit of a
+    processar_multi_unitario result into a ZIP archive.
+
+    Reports are rendered RELATORIOS_POR_TAREFA at a time by a process pool
+    (n_processos; None: one per CPU; in this process below
+    MIN_RELATORIOS_PARALELO units). Each PDF is written to the archive as
+    soon as its batch finishes, so only the reports in flight are held in
+    memory. Workers receive just the figures a report needs, not the full
+    results.
+
+    Args:
+        unidades: 'unidades' of processar_multi_unitario; units without
+            _resultado (errors, or manter_detalhe=False) are skipped.
+        destino: Path or writable binary file object for the ZIP.
+        n_processos: Worker processes.
+        progress_callback: Optional callable(progress_float, status_text).
+        backend_grafico: One of BACKENDS_GRAFICO. "reportlab" draws the
+            chart as vectors; "plotly" exports each batch's charts with
+            exportar_pngs (workers keep a warm renderer).
+
+    Returns:
+        Number of reports written. Files are named
+        "<unit number>_<unit name>.pdf", numbered in input order.
+    """
+    if backend_grafico not in BACKENDS_GRAFICO:
+        raise ValueError(
+            f"Backend de gráfico não suportado: '{backend_grafico}'. Opções: {', '.join(BACKENDS_GRAFICO)}"
+        )
+    largura = len(str(len(unidades)))
+    relatorios = [
+        (f"{numero:0{largura}d}_{_nome_arquivo(r['Nome'], numero)}.pdf", _dados_relatorio(r, numero))
+        for numero, r in enumerate(unidades, start=1)
+        if "_resultado" in r
+    ]
+    total = len(relatorios)
+    tarefas = [relatorios[i:i + RELATORIOS_POR_TAREFA] for i in range(0, total, RELATORIOS_POR_TAREFA)]
+    n_processos = min(n_processos or os.cpu_count() or 1, len(tarefas))
+
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        if n_processos > 1 and total >= MIN_RELATORIOS_PARALELO:
+            gerados = _gerar_relatorios_paralelo(tarefas, n_processos, backend_grafico)
+        else:
+            gerados = (
+                (nome, pdf)
+                for tarefa in tarefas
+                for nome, pdf in zip((nome for nome, _ in tarefa), _gerar_pdfs([d for _, d in tarefa], backend_grafico))
+            )
+        for feitos, (nome, pdf) in enumerate(gerados, start=1):
+            zf.writestr(nome, pdf)
+            if progress_callback:
+                progress_callback(feitos / total, f"Relatórios gerados: {feitos}/{total}")
+    return total
+
+
+def _nome_arquivo(nome, numero: int) -> str:
+    nome = "" if isinstance(nome, float) and np.isnan(nome) else str(nome)
+    return re.sub(r"[^\w\-]+", "_", nome).strip("_") or f"Unidade_{numero}"
+
+
+def _dados_relatorio(entrada: dict, numero: int) -> dict:
+    """Picklable inputs of one unit's report (gerar_relatorio + chart)."""
+    res = entrada["_resultado"]
+    nome = entrada["Nome"]
+    return {
+        "nome_cliente": "" if isinstance(nome, float) and np.isnan(nome) else str(nome),
+        "desconto": res["desconto_geral"],
+        "economia": res["economia_total"],
+        "periodo": res["periodo"],
+        "resultados_anuais": res["resultados_anuais"],
+        "numero_unidade": numero,
+        "grafico_series": (res["gastos_acl_anual"], res["economias_anual"], res["anos"]),
+    }
+
+
+def _gerar_pdfs(lote: list[dict], backend_grafico: str = BACKEND_GRAFICO_LOTE) -> list[bytes]:
+    """PDFs of a batch of _dados_relatorio. With the plotly backend the
+    charts are exported in one call (vectors remain the fallback)."""
+    if backend_grafico == "plotly":
+        pngs = exportar_pngs([criar_grafico_economia(*dados["grafico_series"]) for dados in lote])
+    else:
+        pngs = [None] * len(lote)
+    return [gerar_relatorio(grafico_png=png, **dados) for dados, png in zip(lote, pngs)]
+
+
+def _gerar_relatorios_paralelo(
+    tarefas: list[list[tuple[str, dict]]], n_processos: int, backend_grafico: str = BACKEND_GRAFICO_LOTE
+) -> Iterator[tuple[str, bytes]]:
+    """(file name, PDF) pairs rendered by a process pool, in completion
+    order of the tasks. At most two tasks per worker are in flight."""
+    with ProcessPoolExecutor(
+        max_workers=n_processos,
+        mp_context=multiprocessing.get_context(CONTEXTO_PROCESSOS),
+        initializer=iniciar_renderizador if backend_grafico == "plotly" else None,
+    ) as executor:
+        pendentes = {}
+
+        def receber(futuros):
+            for futuro in futuros:
+                yield from zip(pendentes.pop(futuro), futuro.result())
+
+        for tarefa in tarefas:
+            futuro = executor.submit(_gerar_pdfs, [dados for _, dados in tarefa], backend_grafico)
+            pendentes[futuro] = [nome for nome, _ in tarefa]
+            if len(pendentes) >= 2 * n_processos:
+                yield from receber(wait(pendentes, return_when=FIRST_COMPLETED).done)
+        yield from receber(as_completed(list(pendentes)))
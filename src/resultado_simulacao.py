@@ -0,0 +1,224 @@
+from collections.abc import Mapping, Sequence
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from src.constantes import MESES_PT
+from src.models import TarifasCongeladas, TarifasVigentes
+
+# Monthly totals, in the order of the resultados_mensais rows
+COLUNAS_MENSAIS = ["custo_acr_mwh", "custo_acl_mwh", "desconto", "economia", "gasto_acr", "gasto_acl"]
+COLUNAS_ANUAIS = ["ano", "gasto_acr", "gasto_acl", "economia", "desconto", "meses"]
+
+ERRO_SOMENTE_LEITURA = "Resultado em cache é somente leitura; use dict(resultado) para uma cópia."
+
+CHAVES_RESULTADO = (
+    "resultados_mensais",
+    "resultados_anuais",
+    "desconto_geral",
+    "economia_total",
+    "economia_vpl",
+    "periodo",
+    "gastos_acl_anual",
+    "gastos_acr_anual",
+    "economias_anual",
+    "anos",
+    "tarifas_utilizadas",
+)
+
+
+class LinhasMensais(Sequence):
+    """resultados_mensais as a lazy list: each month's dict is built on access."""
+
+    def __init__(self, resultado: "ResultadoSimulacao"):
+        self._resultado = resultado
+
+    def __len__(self) -> int:
+        return len(self._resultado.meses)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._resultado.linha_mensal(k) for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._resultado.linha_mensal(i)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Sequence) and list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"LinhasMensais({len(self)} meses)"
+
+
+class ResultadoSimulacao(Mapping):
+    """Simulation result stored as NumPy columns (struct of arrays).
+
+    Reads like the dict LogicaCalculadora used to return: the same keys,
+    with resultados_mensais / resultados_anuais and the annual lists built
+    on access from the arrays. to_dataframe() gives the monthly (or annual)
+    table directly.
+
+    Attributes:
+        meses, anos: (M,) int arrays.
+        mensal: {COLUNAS_MENSAIS: (M,) array}.
+        acr, acl: {component: (M,) array} (COMPONENTES_ACR / COMPONENTES_ACL).
+        anual: {COLUNAS_ANUAIS: (Y,) array}.
+
+    somente_leitura() gives a frozen copy (read-only arrays and dicts, no
+    attribute assignment) that a cache can hand to several callers.
+    """
+
+    _congelado = False
+
+    def __init__(
+        self,
+        meses: np.ndarray,
+        anos: np.ndarray,
+        mensal: dict,
+        acr: dict,
+        acl: dict,
+        anual: dict,
+        desconto_geral: float,
+        economia_total: float,
+        economia_vpl: float,
+        periodo: list[str],
+        tarifas_utilizadas: TarifasVigentes,
+    ):
+        self.meses = meses
+        self.anos = anos
+        self.mensal = mensal
+        self.acr = acr
+        self.acl = acl
+        self.anual = anual
+        self.desconto_geral = desconto_geral
+        self.economia_total = economia_total
+        self.economia_vpl = economia_vpl
+        self.periodo = periodo
+        self.tarifas_utilizadas = tarifas_utilizadas
+
+    # --- dict-compatible access -------------------------------------------
+
+    def __getitem__(self, chave: str):
+        if chave == "resultados_mensais":
+            return LinhasMensais(self)
+        if chave == "resultados_anuais":
+            colunas = [self.anual[c].tolist() for c in COLUNAS_ANUAIS]
+            return [dict(zip(COLUNAS_ANUAIS, linha)) for linha in zip(*colunas)]
+        if chave == "gastos_acl_anual":
+            return self.anual["gasto_acl"].tolist()
+        if chave == "gastos_acr_anual":
+            return self.anual["gasto_acr"].tolist()
+        if chave == "economias_anual":
+            return self.anual["economia"].tolist()
+        if chave == "anos":
+            return [str(a) for a in self.anual["ano"].tolist()]
+        if chave == "periodo":
+            return list(self.periodo)
+        if chave == "tarifas_utilizadas":
+            return TarifasVigentes(**self.tarifas_utilizadas.model_dump())
+        if chave in ("desconto_geral", "economia_total", "economia_vpl"):
+            return getattr(self, chave)
+        raise KeyError(chave)
+
+    def __iter__(self):
+        return iter(CHAVES_RESULTADO)
+
+    def __setattr__(self, nome, valor):
+        if self._congelado:
+            raise TypeError(ERRO_SOMENTE_LEITURA)
+        super().__setattr__(nome, valor)
+
+    def __delattr__(self, nome):
+        if self._congelado:
+            raise TypeError(ERRO_SOMENTE_LEITURA)
+        super().__delattr__(nome)
+
+    def __reduce__(self):
+        # MappingProxyType does not pickle: rebuild from plain dicts, refreezing
+        argumentos = (
+            self.meses, self.anos,
+            dict(self.mensal), dict(self.acr), dict(self.acl), dict(self.anual),
+            self.desconto_geral, self.economia_total, self.economia_vpl,
+            list(self.periodo), TarifasVigentes(**self.tarifas_utilizadas.model_dump()),
+        )
+        if self._congelado:
+            return (_resultado_congelado, argumentos)
+        return (ResultadoSimulacao, argumentos)
+
+    def __len__(self) -> int:
+        return len(CHAVES_RESULTADO)
+
+    def __repr__(self) -> str:
+        return (
+            f"ResultadoSimulacao({len(self.meses)} meses, desconto_geral={self.desconto_geral:.4f}, "
+            f"economia_total={self.economia_total:.2f})"
+        )
+
+    # --- row views / tables -----------------------------------------------
+
+    def linha_mensal(self, i: int) -> dict:
+        """Month i as the dict resultados_mensais used to hold."""
+        mes = int(self.meses[i])
+        ano = int(self.anos[i])
+        return {
+            "mes": mes,
+            "ano": ano,
+            "mes_nome": MESES_PT[mes - 1],
+            "periodo": f"{MESES_PT[mes - 1]}/{ano}",
+            **{c: float(v[i]) for c, v in self.mensal.items()},
+            "acr_detalhado": {c: float(v[i]) for c, v in self.acr.items()},
+            "acl_detalhado": {c: float(v[i]) for c, v in self.acl.items()},
+        }
+
+    def to_dataframe(self, anual: bool = False) -> pd.DataFrame:
+        """Monthly table (one row per month, ACR/ACL components flattened)
+        or, with anual=True, the annual table."""
+        if anual:
+            return pd.DataFrame({c: self.anual[c] for c in COLUNAS_ANUAIS})
+        nomes = np.array(MESES_PT, dtype=object)[self.meses - 1]
+        return pd.DataFrame({
+            "mes": self.meses,
+            "ano": self.anos,
+            "mes_nome": nomes,
+            "periodo": nomes + "/" + self.anos.astype(str).astype(object),
+            **self.mensal,
+            **self.acr,
+            **self.acl,
+        })
+
+    def somente_leitura(self) -> "ResultadoSimulacao":
+        """Frozen copy for shared caches: arrays are read-only views, the
+        column dicts read-only mappings, and attributes cannot be set."""
+        if self._congelado:
+            return self
+
+        def ro(v):
+            v = v.view()
+            v.flags.writeable = False
+            return v
+
+        def colunas(d):
+            return MappingProxyType({c: ro(v) for c, v in d.items()})
+
+        resultado = ResultadoSimulacao(
+            ro(self.meses),
+            ro(self.anos),
+            colunas(self.mensal),
+            colunas(self.acr),
+            colunas(self.acl),
+            colunas(self.anual),
+            self.desconto_geral,
+            self.economia_total,
+            self.economia_vpl,
+            tuple(self.periodo),
+            TarifasCongeladas(**self.tarifas_utilizadas.model_dump()),
+        )
+        resultado._congelado = True
+        return resultado
+
+
+def _resultado_congelado(*argumentos) -> ResultadoSimulacao:
+    return ResultadoSimulacao(*argumentos).somente_leitura()
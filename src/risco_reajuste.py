@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+from src.models import ParametrosSimulacao
+from src.constantes import REAJUSTE_ANUAL_PADRAO, DESVIO_REAJUSTE_PADRAO
+from src.dados_tarifarios import COMPONENTES_TARIFA
+from src.logica_calculadora import preparar_calculadora
+
+PERCENTIS = (5, 50, 95)
+N_CAMINHOS_PADRAO = 10_000
+
+
+def estimar_reajuste(params: ParametrosSimulacao, historico: pd.DataFrame) -> tuple[float, float]:
+    """Mean annual readjustment and its spread fitted from a tariff history.
+
+    historico is obter_historico_tarifas() for the consumer's key. Each
+    vigência is priced as the consumer's ACR cost (R$/MWh); the last one of
+    each calendar year is kept and the log changes between kept years
+    (per year of gap) give the mean and standard deviation. Falls back to REAJUSTE_ANUAL_PADRAO /
+    DESVIO_REAJUSTE_PADRAO when there are fewer than two changes.
+    """
+    if historico is None or len(historico) < 3:
+        return REAJUSTE_ANUAL_PADRAO, DESVIO_REAJUSTE_PADRAO
+
+    calc = preparar_calculadora(params)
+    tarifas = {c: historico[c].to_numpy(dtype=float) for c in COMPONENTES_TARIFA}
+    custo = pd.Series(
+        calc._calcular_acr_vetorial(tarifas)["custo_total_acr"],
+        index=pd.DatetimeIndex(historico.index).year,
+    )
+    anual = custo[custo > 0].groupby(level=0).last()
+    if len(anual) < 3:
+        return REAJUSTE_ANUAL_PADRAO, DESVIO_REAJUSTE_PADRAO
+
+    # A log change over a gap of g years sums g annual steps (mean μ·g,
+    # variance σ²·g): the spread is taken from (Δ - μ·g) / √g
+    intervalos = np.diff(anual.index.to_numpy(dtype=float))
+    variacoes = np.diff(np.log(anual.to_numpy()))
+    media = (variacoes / intervalos).mean()
+    residuos = (variacoes - media * intervalos) / np.sqrt(intervalos)
+    return float(np.expm1(media)), float(np.sqrt((residuos ** 2).sum() / (len(residuos) - 1)))
+
+
+def simular_reajustes(
+    params: ParametrosSimulacao,
+    n_caminhos: int = N_CAMINHOS_PADRAO,
+    reajuste_medio: float | None = None,
+    desvio: float | None = None,
+    historico: pd.DataFrame | None = None,
+    semente: int | None = None,
+    float32: bool = False,
+) -> dict:
+    """Monte Carlo of the annual tariff readjustment for one simulation.
+
+    The deterministic engine projects every year with REAJUSTE_ANUAL_PADRAO.
+    Here each path draws one log-normal readjustment per contract year
+    (log(1 + r) ~ N(log(1 + reajuste_medio), desvio)). Every tariff
+    component scales with the same factor, so ACR and ACL costs split into
+    a factor-proportional part and a fixed part (PD prices, CCEE) and the
+    whole run reduces to (paths × years) matrix products.
+
+    Args:
+        params: Base simulation (offer, contract, taxa_vpl).
+        n_caminhos: Number of paths.
+        reajuste_medio / desvio: Readjustment parameters; when omitted they
+            come from historico (estimar_reajuste) or the defaults.
+        historico: obter_historico_tarifas() of the consumer's key.
+        semente: Seed for reproducible runs.
+        float32: Keep the path matrices in float32 to halve memory.
+
+    Returns:
+        {'n_caminhos', 'reajuste_medio', 'desvio', 'anos',
+         'economia_total', 'economia_vpl', 'desconto_geral'} where each
+        metric maps 'P5'/'P50'/'P95' to a float, plus 'economia_anual'
+        mapping the same keys to per-year lists (fan chart).
+    """
+    if reajuste_medio is None or desvio is None:
+        media_hist, desvio_hist = (
+            estimar_reajuste(params, historico) if historico is not None
+            else (REAJUSTE_ANUAL_PADRAO, DESVIO_REAJUSTE_PADRAO)
+        )
+        reajuste_medio = media_hist if reajuste_medio is None else reajuste_medio
+        desvio = desvio_hist if desvio is None else desvio
+
+    dtype = np.float32 if float32 else np.float64
+    calc = preparar_calculadora(params)
+
+    # Month costs at factor 1, split into what scales with the tariffs
+    fatores = calc.fatores
+    acr_base = calc.acr["custo_total_acr"] / fatores
+    fio_base = calc.fio_acl / fatores
+    cg_base = calc.energia_cg / fatores
+    if calc.tipo_oferta == "Desconto Garantido":
+        energia_escala = cg_base * (1 - calc.desconto_garantido / 100.0)
+        energia_fixa = np.zeros_like(cg_base)
+    elif calc.precos_por_ano:
+        precos = np.asarray(calc.precos_por_ano, dtype=float)
+        energia_escala = np.zeros_like(cg_base)
+        energia_fixa = calc._bruto_pd(precos[np.minimum(calc.year_idx, len(precos) - 1)])
+    else:
+        energia_escala = calc._bruto_pd(cg_base)
+        energia_fixa = np.zeros_like(cg_base)
+
+    anos_unicos, posicao = np.unique(calc.anos, return_inverse=True)
+    n_anos = len(anos_unicos)
+
+    def por_ano(valores):
+        return np.bincount(posicao, weights=valores * calc.consumo_total_mwh, minlength=n_anos).astype(dtype)
+
+    acr_ano = por_ano(acr_base)
+    acl_escala_ano = por_ano(fio_base + energia_escala)
+    acl_fixo_ano = por_ano(energia_fixa + calc.despesas_ccee)
+
+    # (paths × years) readjustment factors; year 0 keeps the current tariff
+    rng = np.random.default_rng(semente)
+    passos = rng.standard_normal(size=(n_caminhos, max(n_anos - 1, 0)), dtype=dtype)
+    passos *= dtype(desvio)
+    passos += dtype(np.log1p(reajuste_medio))
+    fator = np.ones((n_caminhos, n_anos), dtype=dtype)
+    if n_anos > 1:
+        fator[:, 1:] = np.exp(np.cumsum(passos, axis=1))
+
+    gasto_acr_anual = fator * acr_ano
+    gasto_acl_anual = fator * acl_escala_ano + acl_fixo_ano
+    economia_anual = gasto_acr_anual - gasto_acl_anual
+
+    economia_total = economia_anual.sum(axis=1)
+    gasto_acr_total = gasto_acr_anual.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        desconto_geral = np.where(
+            gasto_acr_total != 0, 1 - gasto_acl_anual.sum(axis=1) / gasto_acr_total, 0.0
+        )
+
+    taxa_anual = (1 + calc.taxa_mensal_vpl) ** 12 - 1
+    if n_anos > 0 and taxa_anual > 0:
+        with np.errstate(over="ignore"):
+            descontos_vpl = (1 + taxa_anual) ** -np.arange(n_anos, dtype=float)
+        economia_vpl = economia_anual @ descontos_vpl.astype(dtype)
+        economia_vpl = np.where(np.isfinite(economia_vpl), economia_vpl, economia_total)
+    else:
+        economia_vpl = economia_total
+
+    def faixas(amostras, eixo=None):
+        valores = np.percentile(amostras, PERCENTIS, axis=eixo)
+        return {f"P{p}": v.tolist() if eixo is not None else float(v) for p, v in zip(PERCENTIS, valores)}
+
+    return {
+        "n_caminhos": n_caminhos,
+        "reajuste_medio": float(reajuste_medio),
+        "desvio": float(desvio),
+        "anos": anos_unicos.tolist(),
+        "economia_total": faixas(economia_total),
+        "economia_vpl": faixas(economia_vpl),
+        "desconto_geral": faixas(desconto_geral),
+        "economia_anual": faixas(economia_anual, eixo=0),
+    }